@@ -0,0 +1,187 @@
+import csv
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+
+from .models import Post
+from .serializers import PostSerializer
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_ndjson(lines):
+    """
+    Parse newline-delimited JSON, one object per line.
+    Yields (row_number, row, error) so a bad line is reported
+    instead of aborting the whole import.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, {"non_field_errors": [f"Invalid JSON: {e}"]}
+            continue
+        if not isinstance(row, dict):
+            yield number, None, {"non_field_errors": ["Each line must be a JSON object."]}
+            continue
+        yield number, row, None
+
+
+def iter_csv(lines):
+    """
+    Parse CSV with a header row (e.g. `content,owner_username`).
+    Yields (row_number, row, error) like `iter_ndjson`.
+    """
+    decoded = (
+        line.decode("utf-8") if isinstance(line, bytes) else line
+        for line in lines
+    )
+    for number, row in enumerate(csv.DictReader(decoded), start=1):
+        yield number, row, None
+
+
+def iter_rows(rows):
+    """Wrap an already-parsed list of dicts (e.g. a JSON request body)."""
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            yield number, None, {"non_field_errors": ["Each item must be an object."]}
+            continue
+        yield number, row, None
+
+
+class PostImporter:
+    """
+    Validate rows with PostSerializer and insert them with bulk_create,
+    one transaction per batch. A failing row is recorded in `errors`
+    and skipped; it never rolls back rows from other batches.
+
+    If `owner` is given every post belongs to that user, otherwise each
+    row must carry `owner` (a user id) or `owner_username`.
+    """
+
+    def __init__(self, owner=None, batch_size=DEFAULT_BATCH_SIZE, max_errors=1000):
+        self.owner = owner
+        self.batch_size = max(1, int(batch_size))
+        self.max_errors = max_errors
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, parsed_rows):
+        started = time.monotonic()
+        batch = []
+        for number, row, error in parsed_rows:
+            if error:
+                self._record_error(number, error)
+                continue
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch)
+                batch = []
+        if batch:
+            self._process_batch(batch)
+        # Parse errors are recorded as they are read, validation errors
+        # when their batch runs; report them in row order.
+        self.errors.sort(key=lambda error: error["row"])
+
+        elapsed = time.monotonic() - started
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.created / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def _record_error(self, number, error):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({"row": number, "errors": error})
+
+    @staticmethod
+    def _owner_ref(row):
+        """
+        (field, value) for the owner a row names: `owner` or
+        `owner_username`, with the value as a string. The value is None
+        if it isn't a string or an integer (e.g. a JSON list), and the
+        field too if the row names no owner.
+        """
+        for field in ("owner", "owner_username"):
+            value = row.get(field)
+            if value:
+                if isinstance(value, bool) or not isinstance(value, (str, int)):
+                    return field, None
+                return field, str(value)
+        return None, None
+
+    def _resolve_owners(self, batch):
+        """Look up the owners referenced by a batch with at most two queries."""
+        if self.owner is not None:
+            return {}, {}
+        ids, usernames = set(), set()
+        for _, row in batch:
+            field, value = self._owner_ref(row)
+            if value is None:
+                continue
+            if field == "owner":
+                ids.add(value)
+            else:
+                usernames.add(value)
+        by_id = {}
+        if ids:
+            valid_ids = [int(i) for i in ids if i.isdigit()]
+            by_id = {
+                str(u.id): u for u in User.objects.filter(id__in=valid_ids)
+            }
+        by_username = {}
+        if usernames:
+            by_username = {
+                u.username: u for u in User.objects.filter(username__in=usernames)
+            }
+        return by_id, by_username
+
+    def _owner_for(self, row, by_id, by_username):
+        if self.owner is not None:
+            return self.owner
+        field, value = self._owner_ref(row)
+        if value is None:
+            return None
+        return (by_id if field == "owner" else by_username).get(value)
+
+    def _process_batch(self, batch):
+        by_id, by_username = self._resolve_owners(batch)
+        posts, numbers = [], []
+        for number, row in batch:
+            owner = self._owner_for(row, by_id, by_username)
+            if owner is None:
+                field, value = self._owner_ref(row)
+                if field is not None and value is None:
+                    self._record_error(number, {field: ["Must be a user id or username."]})
+                else:
+                    self._record_error(number, {"owner": ["Unknown or missing owner."]})
+                continue
+            serializer = PostSerializer(data=row)
+            if not serializer.is_valid():
+                self._record_error(number, serializer.errors)
+                continue
+            posts.append(Post(owner=owner, **serializer.validated_data))
+            numbers.append(number)
+
+        if not posts:
+            return
+        try:
+            with transaction.atomic():
+                Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        except DatabaseError as e:
+            for number in numbers:
+                self._record_error(number, {"non_field_errors": [f"Database error: {e}"]})
+            return
+        self.created += len(posts)
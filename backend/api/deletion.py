@@ -0,0 +1,108 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AccountDeletion, Follow, Like, Post, PostRevision, Profile
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 500
+
+
+def schedule_account_deletion(user):
+    """
+    Disable `user` immediately and record a pending purge.
+    Returns the AccountDeletion row; scheduling twice returns the same row.
+    """
+    with transaction.atomic():
+        User.objects.filter(id=user.id).update(is_active=False)
+        job, _ = AccountDeletion.objects.get_or_create(
+            account_id=user.id,
+            defaults={"username": user.username},
+        )
+    return job
+
+
+def _delete_in_batches(queryset, batch_size):
+    """
+    Delete the rows of `queryset` one bounded batch (and one short
+    transaction) at a time, so no single statement holds the write
+    lock for long. Yields the number of rows removed per batch.
+    """
+    model = queryset.model
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(id__in=ids).delete()
+        yield deleted
+
+
+def _save_progress(job, *fields):
+    job.save(update_fields=[*fields, "updated_at"])
+
+
+def purge_account(job_id, batch_size=PURGE_BATCH_SIZE):
+    """
+    Remove everything owned by the account behind `job_id` in batches,
+    recording progress on the job as it goes. Safe to re-run after a
+    crash: each step only deletes what is still there.
+    """
+    job = AccountDeletion.objects.get(id=job_id)
+    if job.status == AccountDeletion.DONE:
+        return job
+    job.status = AccountDeletion.RUNNING
+    _save_progress(job, "status")
+
+    try:
+        user_id = job.account_id
+
+        for deleted in _delete_in_batches(Like.objects.filter(owner_id=user_id), batch_size):
+            job.likes_deleted += deleted
+            _save_progress(job, "likes_deleted")
+
+        posts = Post.objects.filter(owner_id=user_id)
+        while True:
+            post_ids = list(posts.values_list("id", flat=True)[:batch_size])
+            if not post_ids:
+                break
+            # Other users' likes and the revision history of these posts go
+            # first so the post delete never cascades into an unbounded delete.
+            for deleted in _delete_in_batches(Like.objects.filter(post_id__in=post_ids), batch_size):
+                job.likes_deleted += deleted
+                _save_progress(job, "likes_deleted")
+            for _ in _delete_in_batches(PostRevision.objects.filter(post_id__in=post_ids), batch_size):
+                pass
+            with transaction.atomic():
+                _, per_model = Post.objects.filter(id__in=post_ids).delete()
+            job.posts_deleted += per_model.get(Post._meta.label, 0)
+            _save_progress(job, "posts_deleted")
+
+        profile_id = Profile.objects.filter(user_id=user_id).values_list("id", flat=True).first()
+        if profile_id is not None:
+            edges = Follow.objects.filter(
+                Q(followed_id=profile_id) | Q(follower_id=profile_id)
+            )
+            for deleted in _delete_in_batches(edges, batch_size):
+                job.follows_deleted += deleted
+                _save_progress(job, "follows_deleted")
+
+        # Only the bare rows are left, so the cascade here is cheap.
+        with transaction.atomic():
+            Profile.objects.filter(user_id=user_id).delete()
+            User.objects.filter(id=user_id).delete()
+    except Exception as e:
+        logger.exception("Purge of account %s failed", job.account_id)
+        job.status = AccountDeletion.FAILED
+        job.last_error = str(e)
+        _save_progress(job, "status", "last_error")
+        raise
+
+    job.status = AccountDeletion.DONE
+    job.finished_at = timezone.now()
+    _save_progress(job, "status", "finished_at")
+    return job
@@ -0,0 +1,112 @@
+import json
+import tempfile
+import uuid
+import zlib
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Follow, Like, Post, Profile
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_DIR = "exports"
+
+
+def _line(record_type, data):
+    return (
+        json.dumps({"type": record_type, **data}, cls=DjangoJSONEncoder) + "\n"
+    ).encode("utf-8")
+
+
+def iter_export_lines(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield a user's data as NDJSON lines (bytes): the profile, then
+    posts, likes, followers and following. Each section is read with
+    `.values().iterator()` so memory stays flat however long the history.
+    """
+    profile = Profile.objects.filter(user=user).values(
+        "id", "profilename", "email", "profileimage"
+    ).first()
+    yield _line("profile", {"username": user.username, **(profile or {})})
+
+    posts = Post.objects.filter(owner=user).order_by("id").values(
+        "id", "content", "created_at", "updated_at"
+    )
+    for post in posts.iterator(chunk_size=chunk_size):
+        yield _line("post", post)
+
+    likes = Like.objects.filter(owner=user).order_by("id").values(
+        "post_id", "created_at"
+    )
+    for like in likes.iterator(chunk_size=chunk_size):
+        yield _line("like", like)
+
+    if profile is None:
+        return
+    followers = Follow.objects.filter(followed_id=profile["id"]).order_by("id").values(
+        "follower_id", "follower__profilename", "created_at"
+    )
+    for row in followers.iterator(chunk_size=chunk_size):
+        yield _line("follower", {
+            "profile_id": row["follower_id"],
+            "profilename": row["follower__profilename"],
+            "followed_at": row["created_at"],
+        })
+
+    following = Follow.objects.filter(follower_id=profile["id"]).order_by("id").values(
+        "followed_id", "followed__profilename", "created_at"
+    )
+    for row in following.iterator(chunk_size=chunk_size):
+        yield _line("following", {
+            "profile_id": row["followed_id"],
+            "profilename": row["followed__profilename"],
+            "followed_at": row["created_at"],
+        })
+
+
+def gzip_stream(chunks, flush_bytes=64 * 1024):
+    """Compress an iterable of bytes into a gzip stream, incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if out:
+            yield out
+        elif pending >= flush_bytes:
+            # Keep the client fed on slow, highly compressible exports.
+            yield compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+    yield compressor.flush()
+
+
+def export_filename(user, gzip=True, when=None):
+    """The download filename for an export made at `when` (default now)."""
+    stamp = (when or timezone.now()).strftime("%Y%m%dT%H%M%S")
+    ext = "ndjson.gz" if gzip else "ndjson"
+    return f"{user.username}-{stamp}.{ext}"
+
+
+def export_storage_name(user):
+    """
+    A fresh storage name for an archive of `user`'s data. The random part
+    keeps it unguessable from the user id and username the API exposes.
+    """
+    return f"{EXPORT_DIR}/{user.id}/{uuid.uuid4().hex}.ndjson.gz"
+
+
+def write_export_archive(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write a gzip export for `user_id` to media storage and return the name
+    it was saved under. The archive is spooled to a temp file first, so it
+    only appears in storage once it is complete.
+    """
+    user = User.objects.get(id=user_id)
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as tmp:
+        for chunk in gzip_stream(iter_export_lines(user, chunk_size=chunk_size)):
+            tmp.write(chunk)
+        tmp.seek(0)
+        return default_storage.save(export_storage_name(user), File(tmp))
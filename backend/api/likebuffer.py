@@ -0,0 +1,211 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+
+from .models import Like, Post
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    """
+    In-process write-behind buffer for like toggles.
+
+    Each pending entry maps (post_id, user_id) to (base, desired): whether
+    the like existed in the DB when first buffered and whether it should
+    exist now. Toggling back to `base` drops the entry, so repeated
+    toggles by the same user collapse to nothing. Entries are written to
+    `Like` in bulk by `flush()`, which runs on an interval, when the
+    buffer reaches `max_pending`, and at process exit.
+
+    Reads overlay pending entries (see `is_liked` and `count_delta`) so a
+    user sees their own toggle before it is flushed. Entries being flushed
+    stay visible until their transaction commits.
+    """
+
+    def __init__(self, max_pending=1000, flush_interval=2.0):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._inflight = {}
+        self._flushes = 0  # completed flushes, see `toggle`
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _current(self, key):
+        """(base, desired) for a key across pending and in-flight entries."""
+        if key in self._pending:
+            return self._pending[key]
+        return self._inflight.get(key)
+
+    def toggle(self, post_id, user_id):
+        """Flip the like state for a user on a post. Returns the new state."""
+        key = (post_id, user_id)
+        with self._lock:
+            known = key in self._pending or key in self._inflight
+            flushes = self._flushes
+        db_value = None
+        if not known:
+            # Read outside the lock; only trusted below if no flush
+            # finished in between (it could have written this key).
+            db_value = Like.objects.filter(post_id=post_id, owner_id=user_id).exists()
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    # The in-flight write will land first; build on top of it.
+                    entry = (inflight[1], inflight[1])
+                else:
+                    if db_value is None or flushes != self._flushes:
+                        db_value = Like.objects.filter(post_id=post_id, owner_id=user_id).exists()
+                    entry = (db_value, db_value)
+            base, desired = entry
+            desired = not desired
+            if desired == base:
+                self._pending.pop(key, None)
+            else:
+                self._pending[key] = (base, desired)
+            size = len(self._pending)
+
+        self._ensure_flusher()
+        if size >= self.max_pending:
+            self._wakeup.set()
+        return desired
+
+    def is_liked(self, post_id, user_id, db_value):
+        with self._lock:
+            entry = self._current((post_id, user_id))
+        return db_value if entry is None else entry[1]
+
+    def count_delta(self, post_id):
+        """Likes to add to the DB count of `post_id` for unflushed toggles."""
+        # A pending entry for a key that is also in flight was built on
+        # top of the in-flight write, so both contributions apply.
+        delta = 0
+        with self._lock:
+            for entries in (self._inflight, self._pending):
+                for (pid, _), (base, desired) in entries.items():
+                    if pid == post_id:
+                        delta += int(desired) - int(base)
+        return delta
+
+    def flush(self):
+        """Write pending toggles to the DB in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+            batch = self._inflight
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Flushing %d buffered likes failed", len(batch))
+                with self._lock:
+                    # Put the entries back underneath anything toggled since.
+                    for key, (base, desired) in batch.items():
+                        newer = self._pending.get(key)
+                        if newer is None:
+                            self._pending[key] = (base, desired)
+                        elif newer[1] == base:
+                            self._pending.pop(key)
+                        else:
+                            self._pending[key] = (base, newer[1])
+                    self._inflight = {}
+                    self._flushes += 1
+                raise
+            with self._lock:
+                self._inflight = {}
+                self._flushes += 1
+            return len(batch)
+
+    def _write(self, batch):
+        to_add = [key for key, (_, desired) in batch.items() if desired]
+        to_remove = [key for key, (_, desired) in batch.items() if not desired]
+
+        with transaction.atomic():
+            if to_remove:
+                by_post = defaultdict(list)
+                for post_id, user_id in to_remove:
+                    by_post[post_id].append(user_id)
+                Like.objects.filter(reduce(or_, (
+                    Q(post_id=post_id, owner_id__in=user_ids)
+                    for post_id, user_ids in by_post.items()
+                ))).delete()
+
+            if to_add:
+                post_ids = {post_id for post_id, _ in to_add}
+                user_ids = {user_id for _, user_id in to_add}
+                # Skip posts/users deleted since the toggle, and likes that
+                # already exist, instead of failing the whole batch.
+                live_posts = set(Post.objects.filter(id__in=post_ids).values_list("id", flat=True))
+                live_users = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+                existing = set(
+                    Like.objects.filter(post_id__in=post_ids, owner_id__in=user_ids)
+                    .values_list("post_id", "owner_id")
+                )
+                Like.objects.bulk_create([
+                    Like(post_id=post_id, owner_id=user_id)
+                    for post_id, user_id in to_add
+                    if post_id in live_posts and user_id in live_users
+                    and (post_id, user_id) not in existing
+                ])
+
+    def _ensure_flusher(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="like-buffer-flush", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self._flush_at_exit)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged; retried on the next tick
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_like_buffer():
+    """The process-wide LikeBuffer, or None when write-behind is disabled."""
+    global _buffer
+    if not getattr(settings, "LIKE_WRITE_BEHIND", False):
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LikeBuffer(
+                    max_pending=getattr(settings, "LIKE_BUFFER_MAX_PENDING", 1000),
+                    flush_interval=getattr(settings, "LIKE_BUFFER_FLUSH_INTERVAL", 2.0),
+                )
+    return _buffer
@@ -0,0 +1,209 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Post, Profile
+
+SCENARIOS = ["feed", "post_detail", "search", "follow"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the feed, post detail, profile search and follow endpoints "
+        "through the Django test client (default) or a running server (--url). "
+        "Reports throughput and latency percentiles; can save a baseline and "
+        "fail when a later run regresses against it. Seed data first with "
+        "`manage.py seed_social_graph`. With --url, start the server with "
+        "THROTTLE_ENABLED=false: throttling is only switched off here for the "
+        "test client, and the run fails if the server answers 429."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                            help="Scenario to run (repeatable). Defaults to all.")
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Measured requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--concurrency", type=int, default=1,
+                            help="Concurrent clients (threads).")
+        parser.add_argument("--user", help="Username to act as. Defaults to the "
+                            "seeded user following the most profiles.")
+        parser.add_argument("--prefix", default="bench_",
+                            help="Username prefix used by seed_social_graph.")
+        parser.add_argument("--url", help="Base URL of a running server, e.g. "
+                            "http://127.0.0.1:8000, started with THROTTLE_ENABLED=false. "
+                            "Without it the test client is used.")
+        parser.add_argument("--save", help="Write results as a JSON baseline.")
+        parser.add_argument("--compare", help="Baseline JSON to compare against.")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Allowed regression as a fraction (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        user = self._pick_user(options)
+        token = str(RefreshToken.for_user(user).access_token)
+        targets = self._targets(user, options["prefix"])
+        scenarios = options["scenario"] or SCENARIOS
+
+        # Throttling would measure the limiter, not the endpoint. This only
+        # reaches the in-process test client; a --url server must be started
+        # with THROTTLE_ENABLED=false.
+        with override_settings(THROTTLE_ENABLED=False):
+            results = {
+                name: self._run(name, targets[name], token, options)
+                for name in scenarios
+            }
+        throttled = {name: r["throttled"] for name, r in results.items() if r["throttled"]}
+        if throttled:
+            counts = ", ".join(f"{name}: {n}" for name, n in throttled.items())
+            raise CommandError(
+                f"The server throttled the benchmark ({counts} responses were 429); "
+                "restart it with THROTTLE_ENABLED=false."
+            )
+
+        self._print(results)
+        meta = {
+            "mode": "http" if options["url"] else "test-client",
+            "concurrency": options["concurrency"],
+            "requests": options["requests"],
+        }
+        if options["save"]:
+            with open(options["save"], "w", encoding="utf-8") as out:
+                json.dump({"meta": meta, "results": results}, out, indent=2)
+            self.stdout.write(f"Saved baseline to {options['save']}.")
+        if options["compare"]:
+            self._compare(results, options["compare"], options["tolerance"])
+
+    def _pick_user(self, options):
+        if options["user"]:
+            try:
+                return User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist.")
+        profile = (
+            Profile.objects.filter(user__username__startswith=options["prefix"])
+            .annotate(n=Count("following")).order_by("-n").select_related("user").first()
+        )
+        if profile is None:
+            raise CommandError("No seeded users found; run seed_social_graph first.")
+        return profile.user
+
+    def _targets(self, user, prefix):
+        """(method, path) pairs to cycle through for each scenario."""
+        post_ids = list(
+            Post.objects.filter(owner__profile__in=user.profile.following.all())
+            .order_by("-created_at").values_list("id", flat=True)[:50]
+        ) or list(Post.objects.values_list("id", flat=True)[:50])
+        others = list(
+            Profile.objects.exclude(user=user).order_by("id").values_list("id", flat=True)[:50]
+        )
+        if not post_ids or not others:
+            raise CommandError("Not enough data; run seed_social_graph first.")
+        return {
+            "feed": [("GET", f"/api/posts/?page={page}") for page in (1, 2, 3)],
+            "post_detail": [("GET", f"/api/posts/{pk}/") for pk in post_ids],
+            "search": [("GET", f"/api/profile/?search={prefix}{i}") for i in range(1, 10)],
+            # Each profile is toggled an even number of times per full
+            # cycle, so repeated runs leave the graph as they found it.
+            "follow": [("PUT", f"/api/profile/{pk}/follow/") for pk in others for _ in (0, 1)],
+        }
+
+    def _request_fn(self, token, options):
+        auth = f"Bearer {token}"
+        if options["url"]:
+            base = options["url"].rstrip("/")
+
+            def send(method, path):
+                req = urllib.request.Request(
+                    base + path, method=method, headers={"Authorization": auth}
+                )
+                try:
+                    with urllib.request.urlopen(req, timeout=30) as resp:
+                        resp.read()
+                        return resp.status
+                except urllib.error.HTTPError as e:
+                    return e.code
+            return send
+
+        local = threading.local()
+
+        def send(method, path):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client(HTTP_AUTHORIZATION=auth)
+            return getattr(client, method.lower())(path).status_code
+        return send
+
+    def _run(self, name, targets, token, options):
+        send = self._request_fn(token, options)
+        for i in range(options["warmup"]):
+            send(*targets[i % len(targets)])
+
+        def timed(i):
+            start = time.perf_counter()
+            status_code = send(*targets[i % len(targets)])
+            return time.perf_counter() - start, status_code
+
+        total = options["requests"]
+        started = time.perf_counter()
+        if options["concurrency"] > 1:
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                samples = list(pool.map(timed, range(total)))
+        else:
+            samples = [timed(i) for i in range(total)]
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(s[0] * 1000 for s in samples)
+        errors = sum(1 for _, code in samples if code >= 400)
+        return {
+            "requests": total,
+            "errors": errors,
+            "throttled": sum(1 for _, code in samples if code == 429),
+            "rps": round(total / elapsed, 1),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p90_ms": round(percentile(latencies, 90), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+
+    def _print(self, results):
+        header = f"{'scenario':<12}{'rps':>9}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'errors':>8}"
+        self.stdout.write(header)
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<12}{r['rps']:>9}{r['mean_ms']:>9}{r['p50_ms']:>9}"
+                f"{r['p90_ms']:>9}{r['p99_ms']:>9}{r['errors']:>8}"
+            )
+
+    def _compare(self, results, path, tolerance):
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, r in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            if r["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"{name}: rps {r['rps']} < baseline {base['rps']}")
+            for key in ("p50_ms", "p99_ms"):
+                if r[key] > base[key] * (1 + tolerance):
+                    regressions.append(f"{name}: {key} {r[key]} > baseline {base[key]}")
+        if regressions:
+            raise CommandError("Performance regression:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}."))
@@ -0,0 +1,73 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import DEFAULT_BATCH_SIZE, PostImporter, iter_csv, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import posts from an NDJSON or CSV file (use '-' for stdin). "
+        "Rows are validated with PostSerializer and inserted in batches; "
+        "invalid rows are reported without aborting the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or '-' to read stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="Input format. Defaults to the file extension, else ndjson.",
+        )
+        parser.add_argument(
+            "--owner",
+            help="Username that owns every imported post. "
+                 "Without it each row needs `owner` or `owner_username`.",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--errors-file",
+            help="Write per-row errors as NDJSON to this file instead of stderr.",
+        )
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["owner"]:
+            try:
+                owner = User.objects.get(username=options["owner"])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist.")
+
+        path = options["path"]
+        fmt = options["format"]
+        if not fmt:
+            fmt = "csv" if path.lower().endswith(".csv") else "ndjson"
+
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            parse = iter_csv if fmt == "csv" else iter_ndjson
+            importer = PostImporter(
+                owner=owner,
+                batch_size=options["batch_size"],
+                max_errors=None,
+            )
+            result = importer.run(parse(stream))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        errors = result.pop("errors")
+        if options["errors_file"]:
+            with open(options["errors_file"], "w", encoding="utf-8") as out:
+                for error in errors:
+                    out.write(json.dumps(error) + "\n")
+        else:
+            for error in errors:
+                self.stderr.write(json.dumps(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} posts, {result['failed']} failed "
+            f"in {result['elapsed_seconds']}s ({result['rows_per_second']} rows/s)."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api.deletion import PURGE_BATCH_SIZE, purge_account
+from api.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Run or resume pending account purges (e.g. after a restart "
+        "interrupted the background job)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument(
+            "--include-failed",
+            action="store_true",
+            help="Also retry purges that previously failed.",
+        )
+
+    def handle(self, *args, **options):
+        statuses = [AccountDeletion.PENDING, AccountDeletion.RUNNING]
+        if options["include_failed"]:
+            statuses.append(AccountDeletion.FAILED)
+
+        jobs = AccountDeletion.objects.filter(status__in=statuses).order_by("id")
+        for job_id in jobs.values_list("id", flat=True):
+            job = purge_account(job_id, batch_size=options["batch_size"])
+            self.stdout.write(
+                f"{job.username}: {job.posts_deleted} posts, {job.likes_deleted} likes, "
+                f"{job.follows_deleted} follows deleted ({job.status})."
+            )
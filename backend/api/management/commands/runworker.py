@@ -0,0 +1,59 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.worker import Worker
+
+
+def _work(poll_interval, schedules, once):
+    # Each process must open its own DB connection.
+    connections.close_all()
+    worker = Worker(poll_interval=poll_interval, schedules=schedules)
+
+    def stop(signum, frame):
+        worker.stopping = True  # finish the current task, then exit
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    worker.run(once=once)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background task workers against the DB-backed queue "
+        "(api.models.Task). No external broker is needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Number of worker processes.")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when no task is due.")
+        parser.add_argument("--no-schedules", action="store_true",
+                            help="Do not enqueue TASK_SCHEDULES entries.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit as soon as no task is due.")
+
+    def handle(self, *args, **options):
+        work_args = (options["poll_interval"], not options["no_schedules"], options["once"])
+        if options["processes"] <= 1:
+            _work(*work_args)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_work, args=work_args, daemon=False)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,150 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Follow, Like, Post, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic social graph for load tests and benchmarks: "
+        "users with profiles, a power-law follow graph, posts and likes. "
+        "Everything is written with bulk inserts and is reproducible via --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--avg-follows", type=float, default=20,
+                            help="Mean number of profiles each user follows.")
+        parser.add_argument("--posts-per-user", type=float, default=5,
+                            help="Mean posts per user.")
+        parser.add_argument("--likes-per-post", type=float, default=3,
+                            help="Mean likes per post.")
+        parser.add_argument("--alpha", type=float, default=1.1,
+                            help="Zipf exponent: higher means a few very popular accounts.")
+        parser.add_argument("--prefix", default="bench_",
+                            help="Username prefix for generated users.")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        prefix = options["prefix"]
+        n = options["users"]
+        started = time.monotonic()
+
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Users with prefix '{prefix}' already exist; pick another --prefix."
+            )
+
+        with transaction.atomic():
+            password = make_password(options["password"])  # hash once, reuse
+            User.objects.bulk_create(
+                [
+                    User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com",
+                         password=password)
+                    for i in range(n)
+                ],
+                batch_size=batch_size,
+            )
+            users = list(
+                User.objects.filter(username__startswith=prefix)
+                .order_by("id").values_list("id", "username")
+            )
+            Profile.objects.bulk_create(
+                [
+                    Profile(user_id=uid, profilename=username,
+                            email=f"{username}@example.com")
+                    for uid, username in users
+                ],
+                batch_size=batch_size,
+            )
+        user_ids = [uid for uid, _ in users]
+        profile_ids = list(
+            Profile.objects.filter(user__username__startswith=prefix).order_by("user_id")
+            .values_list("id", flat=True)
+        )
+        self.stdout.write(f"Created {n} users and profiles.")
+
+        # Popularity follows a Zipf law over a shuffled ranking, so the
+        # celebrity accounts are spread across the id range.
+        ranking = list(range(n))
+        rng.shuffle(ranking)
+        weights = [0.0] * n
+        for rank, index in enumerate(ranking, start=1):
+            weights[index] = 1.0 / rank ** options["alpha"]
+        cum_weights = list(accumulate(weights))
+
+        population = range(n)
+
+        def popular_sample(k, exclude):
+            """Up to `k` distinct popularity-weighted picks (skipping `exclude`)."""
+            chosen = set()
+            k = min(k, n - 1)
+            for _ in range(10):  # bounded retries: the long tail is rarely hit
+                if len(chosen) >= k:
+                    break
+                picks = rng.choices(population, cum_weights=cum_weights, k=k - len(chosen))
+                chosen.update(p for p in picks if p != exclude)
+            return chosen
+
+        edges = 0
+        follow_batch = []
+        for follower in range(n):
+            # Out-degree is heavy tailed too: most follow a few, some follow many.
+            k = int(rng.paretovariate(2.0) * options["avg_follows"] / 2)
+            for followee in popular_sample(k, follower):
+                follow_batch.append(Follow(
+                    followed_id=profile_ids[followee],
+                    follower_id=profile_ids[follower],
+                ))
+            if len(follow_batch) >= batch_size:
+                Follow.objects.bulk_create(follow_batch, batch_size=batch_size)
+                edges += len(follow_batch)
+                follow_batch = []
+        Follow.objects.bulk_create(follow_batch, batch_size=batch_size)
+        edges += len(follow_batch)
+        self.stdout.write(f"Created {edges} follow edges.")
+
+        posts_batch = []
+        post_count = 0
+        for index, uid in enumerate(user_ids):
+            k = int(rng.expovariate(1 / options["posts_per_user"])) if options["posts_per_user"] else 0
+            for _ in range(k):
+                posts_batch.append(Post(
+                    owner_id=uid,
+                    content=f"Synthetic post {post_count} by {prefix}{index}",
+                ))
+                post_count += 1
+            if len(posts_batch) >= batch_size:
+                Post.objects.bulk_create(posts_batch, batch_size=batch_size)
+                posts_batch = []
+        Post.objects.bulk_create(posts_batch, batch_size=batch_size)
+        self.stdout.write(f"Created {post_count} posts.")
+
+        like_batch = []
+        like_count = 0
+        posts = Post.objects.filter(owner__username__startswith=prefix).values_list("id", flat=True)
+        for post_id in posts.iterator(chunk_size=batch_size):
+            k = int(rng.expovariate(1 / options["likes_per_post"])) if options["likes_per_post"] else 0
+            for liker in popular_sample(k, exclude=None):
+                like_batch.append(Like(post_id=post_id, owner_id=user_ids[liker]))
+            if len(like_batch) >= batch_size:
+                Like.objects.bulk_create(like_batch, batch_size=batch_size)
+                like_count += len(like_batch)
+                like_batch = []
+        Like.objects.bulk_create(like_batch, batch_size=batch_size)
+        like_count += len(like_batch)
+        self.stdout.write(f"Created {like_count} likes.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded synthetic graph in {time.monotonic() - started:.1f}s."
+        ))
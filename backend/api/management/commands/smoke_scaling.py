@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _load(url, headers, duration, results):
+    """Client process: hit `url` until `duration` elapses, report counts."""
+    ok = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            req = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                resp.read()
+            ok += 1
+        except (urllib.error.URLError, OSError):
+            errors += 1
+    results.put((ok, errors))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Smoke-test how throughput scales with gunicorn workers: start the "
+        "production config (gunicorn.conf.py) with 1, 2, 4... workers up to "
+        "the core count and drive each with concurrent client processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/ready/",
+                            help="Path to request (default: the readiness check).")
+        parser.add_argument("--token", help="JWT access token for authenticated paths.")
+        parser.add_argument("--duration", type=float, default=5.0,
+                            help="Seconds of load per worker count.")
+        parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--clients-per-worker", type=int, default=2)
+
+    def handle(self, *args, **options):
+        counts = []
+        n = 1
+        while n < options["max_workers"]:
+            counts.append(n)
+            n *= 2
+        counts.append(options["max_workers"])
+
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Bearer {options['token']}"
+
+        self.stdout.write(f"{'workers':>8}{'clients':>9}{'rps':>10}{'errors':>8}{'speedup':>9}")
+        base_rps = None
+        for workers in counts:
+            rps, errors, clients = self._measure(workers, headers, options)
+            base_rps = base_rps or rps
+            speedup = rps / base_rps if base_rps else 0
+            self.stdout.write(f"{workers:>8}{clients:>9}{rps:>10.0f}{errors:>8}{speedup:>8.2f}x")
+
+    def _measure(self, workers, headers, options):
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+             "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+             "--max-requests", "0", "backend.wsgi"],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "THROTTLE_ENABLED": "false"},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            self._wait_ready(base, server)
+            clients = workers * options["clients_per_worker"]
+            results = multiprocessing.Queue()
+            procs = [
+                multiprocessing.Process(
+                    target=_load,
+                    args=(base + options["path"], headers, options["duration"], results),
+                )
+                for _ in range(clients)
+            ]
+            for proc in procs:
+                proc.start()
+            totals = [results.get() for _ in procs]
+            for proc in procs:
+                proc.join()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        ok = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        return ok / options["duration"], errors, clients
+
+    def _wait_ready(self, base, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("gunicorn exited during startup.")
+            try:
+                with urllib.request.urlopen(base + "/ready/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError("gunicorn did not become ready in time.")
@@ -0,0 +1,328 @@
+import bisect
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger("api.slow_queries")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RouteStats:
+    __slots__ = ("requests", "errors", "queries", "db_seconds",
+                 "serialize_seconds", "render_seconds", "total_seconds", "buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class MetricsRegistry:
+    """
+    Counters per (route, method).
+
+    Each process counts in memory. Under gunicorn a scrape reaches one
+    random worker, so with METRICS_DIR set every process also writes its
+    counters to `<METRICS_DIR>/<pid>.json` (at most every
+    METRICS_FLUSH_INTERVAL seconds, from a background thread) and a
+    scrape sums the files of all processes, like prometheus_client's
+    multiprocess mode. An exiting worker folds its file into
+    `archive.json`, so recycled workers' counts are kept without piling
+    up files. The directory should be on tmpfs (e.g. /dev/shm).
+    """
+
+    ARCHIVE = "archive.json"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._dirty = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._folded = False
+        self._flusher_pid = None
+
+    @property
+    def directory(self):
+        return getattr(settings, "METRICS_DIR", "")
+
+    def record(self, route, method, status_code, queries, db_seconds,
+               serialize_seconds, render_seconds, total_seconds):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, total_seconds)
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[(route, method)] = RouteStats()
+            stats.requests += 1
+            if status_code >= 500:
+                stats.errors += 1
+            stats.queries += queries
+            stats.db_seconds += db_seconds
+            stats.serialize_seconds += serialize_seconds
+            stats.render_seconds += render_seconds
+            stats.total_seconds += total_seconds
+            stats.buckets[bucket] += 1
+        if self.directory:
+            self._dirty.set()
+            self._ensure_flusher()
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def snapshot(self):
+        """This process's counters as {(route, method): [requests, ..., buckets]}."""
+        with self._lock:
+            return {
+                key: [s.requests, s.errors, s.queries, s.db_seconds,
+                      s.serialize_seconds, s.render_seconds, s.total_seconds,
+                      list(s.buckets)]
+                for key, s in self._routes.items()
+            }
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _directory_lock(self, exclusive):
+        """Keeps a scrape from reading a file while a worker folds it into the archive."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                rows = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return {(route, method): values for route, method, *values in rows}
+
+    def _write(self, path, snapshot):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump([[route, method, *values] for (route, method), values in snapshot.items()], f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _merge(into, snapshot):
+        for key, values in snapshot.items():
+            total = into.get(key)
+            if total is None:
+                into[key] = [*values[:7], list(values[7])]
+                continue
+            for i in range(7):
+                total[i] += values[i]
+            total[7] = [a + b for a, b in zip(total[7], values[7])]
+        return into
+
+    def flush(self):
+        """Write this process's counters to its file in METRICS_DIR."""
+        if not self.directory:
+            return
+        with self._flush_lock:
+            if self._folded:
+                return
+            self._dirty.clear()
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self._path(f"{os.getpid()}.json"), self.snapshot())
+
+    def fold_into_archive(self):
+        """Add this process's counters to the archive and remove its file (at worker exit)."""
+        if not self.directory:
+            return
+        self.flush()
+        own = self._path(f"{os.getpid()}.json")
+        with self._flush_lock, self._directory_lock(exclusive=True):
+            archive = self._read(self._path(self.ARCHIVE))
+            self._write(self._path(self.ARCHIVE), self._merge(archive, self._read(own)))
+            if os.path.exists(own):
+                os.remove(own)
+            self._folded = True
+
+    def collect(self):
+        """Counters summed over every process sharing METRICS_DIR (or just this one)."""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        totals = {}
+        with self._directory_lock(exclusive=False):
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    self._merge(totals, self._read(self._path(name)))
+        return totals
+
+    def _ensure_flusher(self):
+        # Threads don't survive a fork, so start one per process.
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+            threading.Thread(target=self._run, name="metrics-flush", daemon=True).start()
+
+    def _run(self):
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        while True:
+            self._dirty.wait()
+            time.sleep(interval)
+            try:
+                self.flush()
+            except OSError:
+                logging.getLogger(__name__).exception(
+                    "Writing metrics to %s failed", self.directory
+                )
+
+    def render_prometheus(self):
+        """Render all counters in the Prometheus text exposition format."""
+        snapshot = self.collect()
+
+        counters = [
+            ("api_requests_total", "Requests handled.", 0),
+            ("api_request_errors_total", "Requests that returned a 5xx status.", 1),
+            ("api_db_queries_total", "SQL queries executed.", 2),
+            ("api_db_seconds_total", "Time spent in SQL queries.", 3),
+            ("api_serialize_seconds_total",
+             "Time spent in serializer to_representation, including the queries it runs.", 4),
+            ("api_render_seconds_total", "Time spent encoding serialized data to JSON.", 5),
+        ]
+        lines = []
+        for name, help_text, index in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (route, method), values in sorted(snapshot.items()):
+                lines.append(f'{name}{{route="{route}",method="{method}"}} {values[index]}')
+
+        name = "api_request_duration_seconds"
+        lines.append(f"# HELP {name} Total request latency.")
+        lines.append(f"# TYPE {name} histogram")
+        for (route, method), values in sorted(snapshot.items()):
+            labels = f'route="{route}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, values[7]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {values[0]}')
+            lines.append(f"{name}_sum{{{labels}}} {values[6]}")
+            lines.append(f"{name}_count{{{labels}}} {values[0]}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# Instrumentation frames are never the origin of a query.
+_SKIP_FILES = {
+    __file__,
+    __file__.replace("metrics.py", "middleware.py"),
+    __file__.replace("metrics.py", "nplusone.py"),
+}
+
+
+def project_frame():
+    """The innermost stack frame from project code (not Django/DRF/stdlib)."""
+    base = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename in _SKIP_FILES or "site-packages" in frame.filename:
+            continue
+        if frame.filename.startswith(base):
+            return frame
+    return None
+
+
+def query_origin():
+    """`file:line in function` for the project code that issued a query."""
+    frame = project_frame()
+    if frame is None:
+        return "unknown"
+    base = str(settings.BASE_DIR)
+    return f"{frame.filename[len(base) + 1:]}:{frame.lineno} in {frame.name}"
+
+
+def maybe_log_slow_query(sql, duration):
+    """
+    Log a sampled slow query with the project line that issued it.
+    The stack is only walked for queries that are both slow and sampled.
+    """
+    threshold = getattr(settings, "SLOW_QUERY_MS", 100) / 1000
+    if duration < threshold:
+        return
+    if random.random() >= getattr(settings, "SLOW_QUERY_SAMPLE_RATE", 0.1):
+        return
+    logger.warning(
+        "Slow query (%.1f ms) from %s: %s",
+        duration * 1000, query_origin(), sql[:1000],
+    )
+
+
+_serialize_clock = threading.local()
+
+
+def start_serialize_clock():
+    """Reset this thread's serialization time; called at the start of a request."""
+    _serialize_clock.seconds = 0.0
+    _serialize_clock.depth = 0
+
+
+def serialize_seconds():
+    """Serialization time on this thread since `start_serialize_clock`."""
+    return getattr(_serialize_clock, "seconds", 0.0)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin that adds the time spent in `to_representation` to
+    this thread's serialization clock, including the queries it runs
+    (SerializerMethodFields and related lookups). Only the outermost call
+    is counted, so nested timed serializers aren't counted twice.
+    """
+
+    def to_representation(self, instance):
+        if getattr(_serialize_clock, "depth", 0):
+            return super().to_representation(instance)
+        _serialize_clock.depth = 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            _serialize_clock.depth = 0
+            _serialize_clock.seconds = serialize_seconds() + time.perf_counter() - start
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that records its own rendering time on the request. This
+    is only the JSON encoding; serializer work is timed separately by
+    TimedSerializerMixin.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            request = (renderer_context or {}).get("request")
+            if request is not None:
+                http_request = request._request
+                http_request.render_seconds = (
+                    getattr(http_request, "render_seconds", 0.0)
+                    + time.perf_counter() - start
+                )
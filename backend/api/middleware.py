@@ -0,0 +1,180 @@
+import gzip
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional dependency; gzip is always available
+    brotli = None
+
+from .metrics import maybe_log_slow_query, registry, serialize_seconds, start_serialize_clock
+
+
+class QueryTimer:
+    """DB execute wrapper that counts queries and sums their duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.duration += elapsed
+            self.count += 1
+            maybe_log_slow_query(sql, elapsed)
+
+    def install(self, stack):
+        """Wrap every DB connection for the lifetime of `stack`."""
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(self))
+
+
+class MetricsMiddleware:
+    """
+    Record query count, DB time, serialization time, render time and total
+    latency per route into `api.metrics.registry`. Put it first in
+    MIDDLEWARE so the latency covers the whole stack. The QueryTimer it installs is shared with
+    RequestCostMiddleware through `request.query_timer`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        start_serialize_clock()
+        timer = request.query_timer = QueryTimer()
+        with ExitStack() as stack:
+            timer.install(stack)
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        registry.record(
+            route,
+            request.method,
+            response.status_code,
+            timer.count,
+            timer.duration,
+            serialize_seconds(),
+            getattr(request, "render_seconds", 0.0),
+            total,
+        )
+        return response
+
+
+class RequestCostMiddleware:
+    """
+    Measure the DB time of each request and charge it to the token buckets
+    the request was admitted by (see api.throttling), at one token per
+    `THROTTLE_DB_MS_PER_TOKEN` milliseconds. The token taken up front pays
+    for the first `THROTTLE_DB_MS_PER_TOKEN` ms, so a cheap request costs
+    exactly one token and a bucket of capacity N admits N of them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = getattr(request, "query_timer", None)
+        if timer is not None:
+            response = self.get_response(request)
+        else:
+            timer = QueryTimer()
+            with ExitStack() as stack:
+                timer.install(stack)
+                response = self.get_response(request)
+
+        buckets = getattr(request, "throttle_buckets", None)
+        if buckets:
+            ms_per_token = getattr(settings, "THROTTLE_DB_MS_PER_TOKEN", 50)
+            cost = (timer.duration * 1000) / ms_per_token - 1
+            for bucket in buckets:
+                bucket.charge(cost)
+        return response
+
+
+def parse_accept_encoding(header):
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON responses larger than COMPRESSION_MIN_SIZE bytes with
+    Brotli (when the `brotli` package is installed) or gzip, whichever the
+    client prefers. Streaming responses and bodies that already carry a
+    Content-Encoding (e.g. the gzip export) are left alone.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.content_types = tuple(getattr(
+            settings, "COMPRESSION_CONTENT_TYPES", ("application/json",)
+        ))
+
+    def choose_coding(self, request):
+        codings = parse_accept_encoding(request.headers.get("Accept-Encoding", ""))
+        wildcard = codings.get("*", 0.0)
+        choices = []
+        if brotli is not None:
+            choices.append(("br", codings.get("br", wildcard)))
+        choices.append(("gzip", codings.get("gzip", wildcard)))
+        coding, q = max(choices, key=lambda choice: choice[1])
+        return coding if q > 0 else None
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not response.get("Content-Type", "").startswith(self.content_types):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < self.min_size:
+            return response
+
+        coding = self.choose_coding(request)
+        if coding is None:
+            return response
+        if coding == "br":
+            compressed = brotli.compress(response.content, quality=5)
+        else:
+            compressed = gzip.compress(response.content, compresslevel=6, mtime=0)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = coding
+        # The compressed body is not byte-identical to the uncompressed one.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
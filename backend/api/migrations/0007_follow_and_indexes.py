@@ -0,0 +1,90 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0006_accountdeletion'),
+    ]
+
+    operations = [
+        # Adopt the auto-created api_profile_followers table as the explicit
+        # Follow model. Only the migration state changes here; the table,
+        # its rows and its (from, to) unique constraint stay as they are.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Follow',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('from_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.profile')),
+                        ('to_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.profile')),
+                    ],
+                    options={
+                        'db_table': 'api_profile_followers',
+                        'unique_together': {('from_profile', 'to_profile')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='profile',
+                    name='followers',
+                    field=models.ManyToManyField(blank=True, related_name='following', through='api.Follow', through_fields=('from_profile', 'to_profile'), to='api.profile'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        # The single-column FK indexes are prefixes of the composite
+        # indexes below, so drop them to save work on every write.
+        migrations.AlterField(
+            model_name='follow',
+            name='from_profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.profile'),
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='to_profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.profile'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['to_profile', 'from_profile'], name='follow_to_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['from_profile', 'created_at'], name='follow_from_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['to_profile', 'created_at'], name='follow_to_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['owner', '-created_at'], name='post_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at'], name='post_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='like',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='api.post'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['post', 'owner'], name='like_post_owner_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_post_version'),
+    ]
+
+    operations = [
+        # Name the Follow columns for what they hold. The db_columns keep
+        # the existing from_profile_id/to_profile_id columns, so only the
+        # migration state changes.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='follow',
+                    old_name='from_profile',
+                    new_name='followed',
+                ),
+                migrations.RenameField(
+                    model_name='follow',
+                    old_name='to_profile',
+                    new_name='follower',
+                ),
+                migrations.AlterField(
+                    model_name='follow',
+                    name='followed',
+                    field=models.ForeignKey(db_column='from_profile_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.profile'),
+                ),
+                migrations.AlterField(
+                    model_name='follow',
+                    name='follower',
+                    field=models.ForeignKey(db_column='to_profile_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.profile'),
+                ),
+                migrations.AlterField(
+                    model_name='profile',
+                    name='followers',
+                    field=models.ManyToManyField(blank=True, related_name='following', through='api.Follow', through_fields=('followed', 'follower'), to='api.profile'),
+                ),
+                migrations.RemoveIndex(model_name='follow', name='follow_to_from_idx'),
+                migrations.RemoveIndex(model_name='follow', name='follow_from_created_idx'),
+                migrations.RemoveIndex(model_name='follow', name='follow_to_created_idx'),
+                migrations.AddIndex(
+                    model_name='follow',
+                    index=models.Index(fields=['follower', 'followed'], name='follow_to_from_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='follow',
+                    index=models.Index(fields=['followed', 'created_at'], name='follow_from_created_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='follow',
+                    index=models.Index(fields=['follower', 'created_at'], name='follow_to_created_idx'),
+                ),
+            ],
+        ),
+    ]
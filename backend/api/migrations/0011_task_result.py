@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_rename_follow_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_task_result'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_created_idx',
+        ),
+    ]
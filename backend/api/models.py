@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Profile(models.Model):
     """
@@ -21,6 +22,8 @@ class Profile(models.Model):
     # related_name='following' means from B’s viewpoint: B.following includes A if B is in A.followers
     followers = models.ManyToManyField(
         'self',
+        through='Follow',
+        through_fields=('followed', 'follower'),
         symmetrical=False,
         related_name='following',
         blank=True
@@ -52,28 +55,200 @@ class Profile(models.Model):
         return self.profilename
 
 
+class Follow(models.Model):
+    """
+    One edge of the follow graph: `follower` follows `followed`.
+    Explicit through model for Profile.followers, kept on the table (and
+    columns) the auto-created one used. The unique (followed, follower)
+    constraint serves "who follows X", the (follower, followed) index
+    serves "who does X follow" and both existence checks; the created_at
+    indexes serve ordered lists.
+    """
+    followed = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_column='from_profile_id',
+        db_index=False
+    )
+    follower = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_column='to_profile_id',
+        db_index=False
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'api_profile_followers'
+        unique_together = [('followed', 'follower')]
+        indexes = [
+            models.Index(fields=['follower', 'followed'], name='follow_to_from_idx'),
+            models.Index(fields=['followed', 'created_at'], name='follow_from_created_idx'),
+            models.Index(fields=['follower', 'created_at'], name='follow_to_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} follows {self.followed_id}"
+
+
 class Post(models.Model):
     content = models.TextField()
+    # Covered by the (owner, created_at) index below.
     owner = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
-        related_name="posts"
+        related_name="posts",
+        db_index=False
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every edit; the ETag and If-Match precondition of the
+    # post detail endpoint (see api.revisions).
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', '-created_at'], name='post_owner_created_idx'),
+        ]
 
     def __str__(self):
         return f"Post by {self.owner.username} at {self.created_at}"
 
 
+class PostRevision(models.Model):
+    """
+    Append-only history of a post: one row per superseded version, written
+    in the same transaction as the edit that replaced it. The current
+    version is the post itself.
+    """
+    # Covered by the (post, version) unique constraint below.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="revisions",
+        db_index=False
+    )
+    version = models.PositiveIntegerField()
+    content = models.TextField()
+    created_at = models.DateTimeField()  # when this version was written
+    replaced_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'version'], name='postrevision_post_version_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} v{self.version}"
+
+
 class Like(models.Model):
+    # Covered by the (post, owner) index below.
     post = models.ForeignKey(
         Post, 
         on_delete=models.CASCADE, 
-        related_name="likes"
+        related_name="likes",
+        db_index=False
     )
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'owner'], name='like_post_owner_idx'),
+        ]
+
     def __str__(self):
         return f"{self.owner.username} liked post {self.post.id}"
+
+
+class AccountDeletion(models.Model):
+    """
+    Progress record for a background account purge.
+    The account is disabled as soon as this row is created; posts,
+    likes and follow edges are then removed in bounded batches.
+    `account_id` is a plain integer because the User row is deleted last.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    account_id = models.IntegerField(unique=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    likes_deleted = models.PositiveIntegerField(default=0)
+    posts_deleted = models.PositiveIntegerField(default=0)
+    follows_deleted = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Deletion of {self.username} ({self.status})"
+
+
+class Task(models.Model):
+    """
+    A unit of background work, run by `manage.py runworker`.
+    Workers claim a task with a conditional UPDATE on `status`, so several
+    worker processes can share the table without an external broker.
+    Higher `priority` runs first; failed tasks are retried with backoff
+    until `max_attempts` is reached. A finished task keeps its function's
+    return value in `result`.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='task_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class PeriodicSchedule(models.Model):
+    """
+    When each entry of settings.TASK_SCHEDULES is next due. Workers advance
+    `next_run_at` with a conditional UPDATE, so exactly one of them
+    enqueues each run.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} next at {self.next_run_at}"
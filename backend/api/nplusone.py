@@ -0,0 +1,149 @@
+import logging
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import query_origin
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 5
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def sql_shape(sql):
+    """Reduce a query to its shape: same statement, any parameters."""
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _STRING.sub("?", sql)
+    return _NUMBER.sub("?", sql)
+
+
+def serializer_field():
+    """
+    `SerializerName.field` for the DRF field being rendered on the current
+    stack, if any. Found by looking for the `field` local that DRF's
+    Serializer.to_representation loop binds for each field.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "to_representation" and code.co_filename.endswith(
+            "rest_framework/serializers.py"
+        ):
+            field = frame.f_locals.get("field")
+            serializer = frame.f_locals.get("self")
+            if field is not None and serializer is not None:
+                return f"{type(serializer).__name__}.{field.field_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryPatternWatcher:
+    """
+    DB execute wrapper that counts queries per SQL shape. The first time a
+    shape runs more than `threshold` times, the stack is inspected once to
+    record the project line and serializer field behind it; queries below
+    the threshold cost only a regex pass.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.counts = {}
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = sql_shape(sql)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == self.threshold + 1:
+            self.origins[shape] = (query_origin(), serializer_field())
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def watch(self):
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(self))
+            yield self
+
+    def violations(self):
+        return [
+            {
+                "sql": shape,
+                "count": self.counts[shape],
+                "origin": origin,
+                "field": field,
+            }
+            for shape, (origin, field) in self.origins.items()
+        ]
+
+    def report(self):
+        lines = []
+        for v in self.violations():
+            where = v["origin"] + (f" (serializer field {v['field']})" if v["field"] else "")
+            lines.append(f"{v['count']}x from {where}: {v['sql'][:300]}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, raise_on_violation=True):
+    """
+    Watch queries inside the block and fail if any SQL shape repeats more
+    than `threshold` times. Usable directly in pytest tests:
+
+        with detect_n_plus_one(threshold=3):
+            client.get("/api/posts/")
+    """
+    if threshold is None:
+        threshold = getattr(settings, "NPLUSONE_THRESHOLD", DEFAULT_THRESHOLD)
+    watcher = QueryPatternWatcher(threshold)
+    with watcher.watch():
+        yield watcher
+    if raise_on_violation and watcher.origins:
+        raise NPlusOneError(
+            f"Repeated query pattern (threshold {threshold}):\n{watcher.report()}"
+        )
+
+
+class NPlusOneAssertionsMixin:
+    """TestCase mixin adding `assertNoNPlusOne`, used as a context manager."""
+
+    def assertNoNPlusOne(self, threshold=None):
+        return detect_n_plus_one(threshold=threshold)
+
+
+class NPlusOneMiddleware:
+    """
+    Staging guard. With NPLUSONE_MODE = "log" repeated query patterns are
+    logged per request; with "raise" the request fails with NPlusOneError.
+    Removed from the stack entirely when the mode is "off".
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, "NPLUSONE_MODE", "off")
+        if self.mode not in ("log", "raise"):
+            raise MiddlewareNotUsed
+        self.threshold = getattr(settings, "NPLUSONE_THRESHOLD", DEFAULT_THRESHOLD)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        watcher = QueryPatternWatcher(self.threshold)
+        with watcher.watch():
+            response = self.get_response(request)
+        if watcher.origins:
+            message = f"N+1 queries in {request.method} {request.path}:\n{watcher.report()}"
+            if self.mode == "raise":
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,72 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post, PostRevision
+
+ANY = "*"
+
+
+def etag_for(version):
+    """The ETag of a post at `version`."""
+    return f'"{version}"'
+
+
+def parse_if_match(value):
+    """
+    Versions listed in an If-Match header: None without the header, ANY
+    for `*`, else a list of ints (empty if nothing parses). Weak tags are
+    accepted because CompressionMiddleware weakens the ETags it compresses.
+    """
+    if value is None:
+        return None
+    if value.strip() == ANY:
+        return ANY
+    versions = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag.isdigit():
+            versions.append(int(tag))
+    return versions
+
+
+def edit_post(pk, editor, content, versions):
+    """
+    Replace the content of post `pk` if `editor` owns it and it is at one
+    of `versions`. Returns True if the edit was applied.
+
+    The precondition is checked by the UPDATE itself, so nothing is read
+    first. The version being replaced is copied into PostRevision by an
+    INSERT ... SELECT with the same condition, in the same transaction.
+    Two editors racing from the same version collide on the (post,
+    version) unique constraint and the loser's transaction rolls back.
+    """
+    if not versions:
+        return False
+    qn = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(versions))
+    archive = (
+        f"INSERT INTO {qn(PostRevision._meta.db_table)} "
+        f"(post_id, version, content, created_at, replaced_at) "
+        f"SELECT id, version, content, updated_at, %s FROM {qn(Post._meta.db_table)} "
+        f"WHERE id = %s AND owner_id = %s AND version IN ({placeholders})"
+    )
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    archive,
+                    [connection.ops.adapt_datetimefield_value(now), pk, editor.id, *versions],
+                )
+            updated = Post.objects.filter(pk=pk, owner=editor, version__in=versions).update(
+                content=content, version=F("version") + 1, updated_at=now
+            )
+            if not updated:
+                transaction.set_rollback(True)
+    except IntegrityError:
+        return False
+    return bool(updated)
@@ -1,8 +1,19 @@
+from django.conf import settings
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Post, Profile, Like
+from .metrics import TimedSerializerMixin
+from .models import Follow, Post, PostRevision, Profile, Like
 
-class ProfileSerializer(serializers.ModelSerializer):
+
+def get_like_buffer():
+    """The write-behind like buffer, imported only when it is enabled."""
+    if not getattr(settings, "LIKE_WRITE_BEHIND", False):
+        return None
+    from .likebuffer import get_like_buffer as buffer
+    return buffer()
+
+
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_username = serializers.ReadOnlyField(source='user.username')
     user_email = serializers.SerializerMethodField()
     followers_count = serializers.SerializerMethodField()
@@ -38,12 +49,12 @@ class ProfileSerializer(serializers.ModelSerializer):
         return obj.user.email
 
     def get_followers_count(self, obj):
-        """Number of users following this profile."""
-        return obj.followers.count()
+        """Number of users following this profile (disabled accounts excluded)."""
+        return obj.followers.filter(user__is_active=True).count()
 
     def get_following_count(self, obj):
-        """Number of users this profile is following."""
-        return obj.following.count()
+        """Number of users this profile is following (disabled accounts excluded)."""
+        return obj.following.filter(user__is_active=True).count()
 
     def get_is_following(self, obj):
         """
@@ -63,7 +74,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         return False
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Basic serializer for the User model.
     We do not directly create a Profile here,
@@ -79,7 +90,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     owner_username = serializers.ReadOnlyField(source='owner.username')
     isOwner = serializers.SerializerMethodField()
     isLiked = serializers.SerializerMethodField()
@@ -98,25 +109,37 @@ class PostSerializer(serializers.ModelSerializer):
             'isLiked', 
             'likes_count', 
             'created_at', 
-            'updated_at'
+            'updated_at',
+            'version'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'owner', 'created_at', 'updated_at', 'version']
 
     def get_isOwner(self, obj):
         """Check if the requesting user is the owner of the post."""
         user = self.context['request'].user
-        return user.is_authenticated and (obj.owner == user)
+        return user.is_authenticated and (obj.owner_id == user.id)
 
     def get_isLiked(self, obj):
         """Check if the requesting user has liked the post."""
         user = self.context['request'].user
         if user.is_authenticated:
-            return obj.likes.filter(owner=user).exists()
+            liked = obj.likes.filter(owner=user).exists()
+            buffer = get_like_buffer()
+            if buffer is not None:
+                liked = buffer.is_liked(obj.id, user.id, liked)
+            return liked
         return False
 
     def get_likes_count(self, obj):
-        """Calculate the total likes for the post."""
-        return obj.likes.count()
+        """
+        Calculate the total likes for the post, including unflushed toggles
+        and excluding disabled accounts.
+        """
+        count = obj.likes.filter(owner__is_active=True).count()
+        buffer = get_like_buffer()
+        if buffer is not None:
+            count += buffer.count_delta(obj.id)
+        return count
 
     def get_owner_profile_image(self, obj):
         """Retrieve the profile image of the owner."""
@@ -125,7 +148,115 @@ class PostSerializer(serializers.ModelSerializer):
         return None
 
 
-class LikeSerializer(serializers.ModelSerializer):
+class CompactPostSerializer(PostSerializer):
+    """
+    PostSerializer without the per-post author fields, for the normalized
+    feed: authors are sent once per page in an `authors` map keyed by
+    `owner` (see `author_map`).
+    """
+    class Meta(PostSerializer.Meta):
+        fields = [
+            field for field in PostSerializer.Meta.fields
+            if field not in ('owner_username', 'owner_profile_image')
+        ]
+
+
+def author_map(posts):
+    """`{owner_id: author}` for the owners of `posts`, in one query."""
+    owner_ids = {post.owner_id for post in posts}
+    profiles = Profile.objects.filter(user_id__in=owner_ids).select_related('user').only(
+        'id', 'profilename', 'profileimage', 'user__id', 'user__username'
+    )
+    return {
+        str(profile.user_id): {
+            'username': profile.user.username,
+            'profile_id': profile.id,
+            'profilename': profile.profilename,
+            'profile_image': profile.profileimage.url if profile.profileimage else None,
+        }
+        for profile in profiles
+    }
+
+
+def viewer_post_fields(data, request):
+    """
+    Copy of cached post `data` with the requesting user's `isOwner` and
+    `isLiked` filled in (one EXISTS query, plus any unflushed toggle).
+    """
+    data = dict(data)
+    user = request.user
+    data['isOwner'] = user.is_authenticated and data['owner'] == user.id
+    liked = False
+    if user.is_authenticated:
+        liked = Like.objects.filter(post_id=data['id'], owner=user).exists()
+        buffer = get_like_buffer()
+        if buffer is not None:
+            liked = buffer.is_liked(data['id'], user.id, liked)
+    data['isLiked'] = liked
+    return data
+
+
+def viewer_profile_fields(data, request):
+    """
+    Copy of cached profile `data` with the requesting user's `isOwner`
+    and `is_following` filled in (one EXISTS query).
+    """
+    data = dict(data)
+    user = request.user
+    data['isOwner'] = user.is_authenticated and data['user'] == user.id
+    following = False
+    if user.is_authenticated:
+        following = Follow.objects.filter(
+            followed_id=data['id'], follower__user=user
+        ).exists()
+    data['is_following'] = following
+    return data
+
+
+class FollowEdgeSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    One row of a followers/following list: the profile at `profile_field`
+    of a Follow edge, plus when the edge was created and whether the
+    viewer follows that profile. `is_following` must be annotated on the
+    edges by the view, so no row needs its own query.
+    """
+    profile_field = None
+
+    def to_representation(self, edge):
+        profile = getattr(edge, self.profile_field)
+        image = profile.profileimage
+        request = self.context.get('request')
+        image_url = None
+        if image:
+            image_url = request.build_absolute_uri(image.url) if request else image.url
+        return {
+            'id': profile.id,
+            'user': profile.user_id,
+            'user_username': profile.user.username,
+            'profilename': profile.profilename,
+            'profileimage': image_url,
+            'is_following': edge.is_following,
+            'followed_at': serializers.DateTimeField().to_representation(edge.created_at),
+        }
+
+
+class FollowerSerializer(FollowEdgeSerializer):
+    """Edges into a profile: `follower` is the follower."""
+    profile_field = 'follower'
+
+
+class FollowingSerializer(FollowEdgeSerializer):
+    """Edges out of a profile: `followed` is the one being followed."""
+    profile_field = 'followed'
+
+
+class PostRevisionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PostRevision
+        fields = ['version', 'content', 'created_at', 'replaced_at']
+
+
+class LikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     owner_username = serializers.ReadOnlyField(source='owner.username')
     post_content = serializers.ReadOnlyField(source='post.content')
 
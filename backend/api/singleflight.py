@@ -0,0 +1,220 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class _Call:
+    """One in-flight computation that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.invalidated = False
+
+
+class SingleFlightCache:
+    """
+    Read-through cache that coalesces concurrent misses for the same key.
+
+    `get(key, compute)` returns a fresh cached value when there is one.
+    Otherwise the first caller runs `compute()` and every concurrent
+    caller for that key waits for its result, so a burst of requests for
+    one hot object costs one computation per process.
+
+    Entries are fresh for `fresh_ttl` seconds and may then be served stale
+    for up to `stale_ttl` more: while one caller recomputes an expired
+    entry, everyone else gets the old value instead of waiting.
+
+    With `shared`, entries live in the Django cache `cache_alias` instead
+    of process memory and a `cache.add` lock elects one process to
+    compute a missing key; the others poll for its result for up to
+    `lock_timeout` seconds before computing it themselves. Invalidation
+    rotates a per-key generation token, so a computation that started
+    before an invalidation can never store its result over it.
+
+    `compute` returning None means "nothing to cache" (e.g. not found).
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, namespace, fresh_ttl=5, stale_ttl=60, max_entries=10000,
+                 shared=False, cache_alias="default", lock_timeout=5):
+        self.namespace = namespace
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self.cache_alias = cache_alias
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, fresh_until, stale_until)
+        self._calls = {}
+
+    def _key(self, key, kind):
+        return f"singleflight:{self.namespace}:{kind}:{key}"
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self, key, compute):
+        now = time.time()
+        generation = None
+        if self.shared:
+            entry, generation = self._read_shared(key)
+        else:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+        stale = None
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                return value
+            if now < stale_until:
+                stale = value
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if stale is not None:
+                return stale
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            value = self._lead(key, call, compute, stale, generation)
+            call.value = value
+            return value
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _lead(self, key, call, compute, stale, generation):
+        """Compute `key` as this process's leader and store the result."""
+        locked = False
+        if self.shared:
+            locked = self.cache.add(self._key(key, "lock"), 1, self.lock_timeout)
+            if not locked:
+                # Another process is computing it.
+                if stale is not None:
+                    return stale
+                value = self._wait_shared(key)
+                if value is not None:
+                    return value
+        try:
+            value = compute()
+            if value is None:
+                # Gone: don't keep serving the old entry as stale.
+                self._drop(key)
+            elif not call.invalidated:
+                self._store(key, value, generation)
+            return value
+        finally:
+            if locked:
+                self.cache.delete(self._key(key, "lock"))
+
+    def _store(self, key, value, generation):
+        now = time.time()
+        entry = (value, now + self.fresh_ttl, now + self.fresh_ttl + self.stale_ttl)
+        if self.shared:
+            self.cache.set(
+                self._key(key, "entry"),
+                {"generation": generation, "entry": entry},
+                self.fresh_ttl + self.stale_ttl,
+            )
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_shared(self, key):
+        """(entry, generation) from the shared cache; entry is None if absent or invalidated."""
+        entry_key, generation_key = self._key(key, "entry"), self._key(key, "generation")
+        found = self.cache.get_many([entry_key, generation_key])
+        generation = found.get(generation_key)
+        stored = found.get(entry_key)
+        if stored is None or stored["generation"] != generation:
+            return None, generation
+        return stored["entry"], generation
+
+    def _wait_shared(self, key):
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(self.poll_interval)
+            entry, _ = self._read_shared(key)
+            if entry is not None:
+                return entry[0]
+            if self.cache.get(self._key(key, "lock")) is None:
+                break
+        return None
+
+    def _drop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared:
+            self.cache.delete(self._key(key, "entry"))
+
+    def invalidate(self, key):
+        """Drop `key` everywhere; an in-flight computation for it won't be stored."""
+        with self._lock:
+            self._entries.pop(key, None)
+            call = self._calls.get(key)
+            if call is not None:
+                call.invalidated = True
+        if self.shared:
+            self.cache.set(self._key(key, "generation"), time.time_ns(), None)
+            self.cache.delete(self._key(key, "entry"))
+
+    def clear(self):
+        """Drop every entry held in this process."""
+        with self._lock:
+            self._entries.clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_detail_cache(namespace):
+    """
+    The single-flight cache for one kind of detail response ("post",
+    "profile"), or None when DETAIL_CACHE_ENABLED is off.
+    """
+    if not getattr(settings, "DETAIL_CACHE_ENABLED", False):
+        return None
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = SingleFlightCache(
+                namespace,
+                fresh_ttl=getattr(settings, "DETAIL_CACHE_TTL", 5),
+                stale_ttl=getattr(settings, "DETAIL_CACHE_STALE_TTL", 60),
+                max_entries=getattr(settings, "DETAIL_CACHE_MAX_ENTRIES", 10000),
+                shared=getattr(settings, "DETAIL_CACHE_SHARED", False),
+                cache_alias=getattr(settings, "DETAIL_CACHE_ALIAS", "default"),
+            )
+    return cache
+
+
+def invalidate_detail(namespace, key):
+    """Invalidate one detail entry, if the detail cache is enabled."""
+    cache = get_detail_cache(namespace)
+    if cache is not None:
+        cache.invalidate(key)
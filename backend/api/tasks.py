@@ -0,0 +1,132 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+from . import deletion, exports
+from .models import Profile, Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskFunction:
+    """A registered task: call it to run inline, `.enqueue()` to defer it."""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, priority=None, delay=None, **kwargs):
+        """
+        Queue a run for a worker and return the Task row. Arguments must be
+        JSON serialisable. `delay` is a timedelta or a number of seconds.
+        """
+        run_at = timezone.now()
+        if delay:
+            run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=run_at,
+        )
+
+
+def task(name=None, priority=0, max_attempts=3):
+    """
+    Register a function as a background task. Its return value is stored
+    on the Task row, so it must be JSON serialisable like the arguments.
+    """
+    def decorator(func):
+        task_name = name or func.__name__
+        registered = TaskFunction(func, task_name, priority, max_attempts)
+        registry[task_name] = registered
+        return registered
+    return decorator
+
+
+@task(priority=10, max_attempts=5)
+def purge_account(job_id):
+    """Purge a disabled account in batches (see api.deletion)."""
+    deletion.purge_account(job_id)
+
+
+@task(priority=5)
+def write_export_archive(user_id):
+    """
+    Write a user's gzip export to media storage (see api.exports) and
+    return its storage name.
+    """
+    return exports.write_export_archive(user_id)
+
+
+@task(priority=-10)
+def cleanup_media():
+    """
+    Delete profile images no Profile references any more, and export
+    archives older than EXPORT_RETENTION_DAYS.
+    """
+    removed = 0
+    if default_storage.exists("profile_images"):
+        referenced = set(
+            Profile.objects.exclude(profileimage="").exclude(profileimage__isnull=True)
+            .values_list("profileimage", flat=True)
+        )
+        _, files = default_storage.listdir("profile_images")
+        for filename in files:
+            name = f"profile_images/{filename}"
+            if name not in referenced:
+                default_storage.delete(name)
+                removed += 1
+
+    cutoff = timezone.now() - timedelta(days=getattr(settings, "EXPORT_RETENTION_DAYS", 7))
+    if default_storage.exists(exports.EXPORT_DIR):
+        user_dirs, _ = default_storage.listdir(exports.EXPORT_DIR)
+        for user_dir in user_dirs:
+            _, files = default_storage.listdir(f"{exports.EXPORT_DIR}/{user_dir}")
+            for filename in files:
+                name = f"{exports.EXPORT_DIR}/{user_dir}/{filename}"
+                if default_storage.get_modified_time(name) < cutoff:
+                    default_storage.delete(name)
+                    removed += 1
+    logger.info("cleanup_media removed %d files", removed)
+    return removed
+
+
+@task(priority=-10)
+def analyze_database():
+    """Refresh the query planner's statistics so index choices stay good."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("ANALYZE")
+        elif connection.vendor == "sqlite":
+            cursor.execute("PRAGMA optimize")
+            cursor.execute("ANALYZE")
+
+
+@task(priority=-10)
+def prune_tasks():
+    """Delete finished tasks older than TASK_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, "TASK_RETENTION_DAYS", 7))
+    deleted, _ = Task.objects.filter(
+        status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def worker_name():
+    return f"{os.uname().nodename}:{os.getpid()}"
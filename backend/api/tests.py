@@ -1,3 +1,972 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import runpy
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from .bulk import PostImporter, iter_rows
+from .deletion import purge_account, schedule_account_deletion
+from .likebuffer import LikeBuffer
+from .models import AccountDeletion, Follow, Like, Post, PostRevision, Profile, Task
+from .metrics import MetricsRegistry, TimedSerializerMixin, registry, serialize_seconds, start_serialize_clock
+from .throttling import ProfileSearchRateThrottle
+from .middleware import CompressionMiddleware, parse_accept_encoding
+from .nplusone import NPlusOneAssertionsMixin, NPlusOneError, sql_shape
+from .serializers import PostSerializer
+from .revisions import edit_post
+from .singleflight import SingleFlightCache, get_detail_cache
+from .tasks import task
+from .views import PostAPIView
+from .worker import Worker
+
+calls = []
+
+
+def load_gunicorn_config():
+    """The namespace of gunicorn.conf.py, without letting it change os.environ."""
+    with mock.patch.dict(os.environ):
+        return runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+
+
+@task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="tests.explode", max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+class NPlusOneDetectionTests(NPlusOneAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="alice", password="pw")
+        Profile.objects.create(user=cls.user, profilename="alice", email="a@example.com")
+        cls.posts = [Post.objects.create(owner=cls.user, content=str(i)) for i in range(6)]
+        Like.objects.create(post=cls.posts[0], owner=cls.user)
+
+    def test_shape_ignores_parameters(self):
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s) AND "x" = 12'),
+            sql_shape('SELECT 1 FROM "t" WHERE "id" IN (%s) AND "x" = 7'),
+        )
+
+    def test_repeated_query_is_flagged(self):
+        with self.assertRaises(NPlusOneError) as ctx:
+            with self.assertNoNPlusOne(threshold=3):
+                for post in Post.objects.all():
+                    post.likes.count()
+        self.assertIn("api/tests.py", str(ctx.exception))
+
+    def test_batched_query_passes(self):
+        with self.assertNoNPlusOne(threshold=3):
+            list(Post.objects.select_related("owner__profile"))
+
+    def test_reports_serializer_field(self):
+        request = RequestFactory().get("/api/posts/")
+        request.user = self.user
+        with self.assertRaises(NPlusOneError) as ctx:
+            with self.assertNoNPlusOne(threshold=3):
+                PostSerializer(Post.objects.all(), many=True, context={"request": request}).data
+        self.assertIn("serializer field PostSerializer.", str(ctx.exception))
+
+
+@skipUnless(connection.vendor == "sqlite", "asserts on SQLite EXPLAIN QUERY PLAN output")
+class QueryPlanTests(TestCase):
+    """The hot feed, like and follow queries must be served by indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="pw")
+        cls.bob = User.objects.create_user(username="bob", password="pw")
+        cls.alice_profile = Profile.objects.create(user=cls.alice, profilename="alice", email="a@example.com")
+        cls.bob_profile = Profile.objects.create(user=cls.bob, profilename="bob", email="b@example.com")
+        cls.alice_profile.follow(cls.bob_profile)
+        cls.post = Post.objects.create(owner=cls.bob, content="hello")
+        Like.objects.create(post=cls.post, owner=cls.alice)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotRegex(plan, r"SCAN api_(post|like|profile_followers)\b(?! USING)")
+
+    def test_feed_reads_owner_created_index(self):
+        feed = PostAPIView.feed_queryset(self.alice)
+        self.assertUsesIndex(feed, "post_owner_created_idx")
+        self.assertNotIn("SCAN auth_user", feed.explain())
+
+    def test_own_posts_need_no_sort(self):
+        posts = Post.objects.filter(owner=self.bob).order_by("-created_at")
+        self.assertUsesIndex(posts, "post_owner_created_idx")
+        self.assertNotIn("TEMP B-TREE", posts.explain())
+
+    def test_like_lookup_uses_post_owner_index(self):
+        likes = Like.objects.filter(post=self.post, owner=self.alice)
+        self.assertUsesIndex(likes, "like_post_owner_idx")
+
+    def test_following_list_uses_to_from_index(self):
+        edges = Follow.objects.filter(follower=self.alice_profile)
+        self.assertUsesIndex(edges, "follow_to_")
+
+    def test_follow_existence_uses_unique_index(self):
+        edges = Follow.objects.filter(followed=self.bob_profile, follower=self.alice_profile)
+        self.assertUsesIndex(edges, "from_profile_id_to_profile_id")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(name="test-worker", schedules=False)
+        self.worker.retry_delay = 0
+
+    def test_runs_higher_priority_first(self):
+        record.enqueue("low", priority=-1)
+        record.enqueue("high", priority=5)
+        self.worker.run(once=True)
+        self.assertEqual(calls, ["high", "low"])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 2)
+
+    def test_delayed_task_waits(self):
+        record.enqueue("later", delay=3600)
+        self.worker.run(once=True)
+        self.assertEqual(calls, [])
+
+    def test_failing_task_is_retried_then_failed(self):
+        queued = explode.enqueue()
+        self.worker.run(once=True)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+        self.assertIn("boom", queued.last_error)
+
+    def test_claimed_task_is_not_claimed_twice(self):
+        record.enqueue("once")
+        self.assertIsNotNone(self.worker.claim())
+        self.assertIsNone(Worker(name="other", schedules=False).claim())
+
+    def test_orphaned_task_is_requeued_until_attempts_run_out(self):
+        queued = record.enqueue("orphan")
+        long_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(id=queued.id).update(status=Task.RUNNING, locked_at=long_ago, attempts=1)
+        self.worker.requeue_stale()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.PENDING)
+
+        Task.objects.filter(id=queued.id).update(
+            status=Task.RUNNING, locked_at=long_ago, attempts=queued.max_attempts
+        )
+        self.worker.requeue_stale()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+
+    def test_heartbeat_keeps_running_task_locked(self):
+        record.enqueue("long")
+        claimed = self.worker.claim()
+        Task.objects.filter(id=claimed.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.worker.lock_timeout = timedelta(seconds=0.03)
+        stop = threading.Event()
+        threading.Timer(0.1, stop.set).start()
+        self.worker.heartbeat(claimed.id, stop)
+        self.worker.lock_timeout = timedelta(hours=1)
+        self.worker.requeue_stale()
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.RUNNING)
+
+
+class FollowListTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        def make(name):
+            user = User.objects.create_user(username=name, password="pw")
+            return Profile.objects.create(user=user, profilename=name, email=f"{name}@example.com")
+
+        cls.viewer = make("viewer")
+        cls.star = make("star")
+        cls.fans = [make(f"fan{i}") for i in range(5)]
+        for fan in cls.fans:
+            Follow.objects.create(followed=cls.star, follower=fan)
+        for fan in cls.fans[:2]:
+            Follow.objects.create(followed=fan, follower=cls.viewer)
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer.user)
+
+    def test_followers_pages_with_cursor(self):
+        url = f"/api/profile/{self.star.id}/followers/?page_size=2"
+        seen = []
+        while url:
+            body = self.client.get(url).json()
+            seen += [row["id"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(sorted(seen), sorted(p.id for p in self.fans))
+
+    def test_is_following_needs_no_per_row_queries(self):
+        url = f"/api/profile/{self.star.id}/followers/"
+        with self.assertNumQueries(2):
+            rows = self.client.get(url).json()["results"]
+        followed = {row["id"] for row in rows if row["is_following"]}
+        self.assertEqual(followed, {p.id for p in self.fans[:2]})
+
+    def test_mutual_lists_followers_the_viewer_follows(self):
+        rows = self.client.get(f"/api/profile/{self.star.id}/mutual/").json()["results"]
+        self.assertEqual({row["id"] for row in rows}, {p.id for p in self.fans[:2]})
+
+    def test_following_lists_outgoing_edges(self):
+        rows = self.client.get(f"/api/profile/{self.viewer.id}/following/").json()["results"]
+        self.assertEqual({row["id"] for row in rows}, {p.id for p in self.fans[:2]})
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_misses_share_one_computation(self):
+        cache = SingleFlightCache("test")
+        started, release = threading.Event(), threading.Event()
+        runs, results = [], []
+
+        def compute():
+            runs.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get(1, compute))) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(results, ["value"] * 5)
+
+    def test_stale_entry_served_while_refreshing(self):
+        cache = SingleFlightCache("test", fresh_ttl=0, stale_ttl=60)
+        cache.get(1, lambda: "old")
+        started, release = threading.Event(), threading.Event()
+
+        def refresh():
+            started.set()
+            release.wait(5)
+            return "new"
+
+        refresher = threading.Thread(target=cache.get, args=(1, refresh))
+        refresher.start()
+        started.wait(5)
+        self.assertEqual(cache.get(1, lambda: "unused"), "old")
+        release.set()
+        refresher.join()
+
+    def test_invalidation_discards_in_flight_result(self):
+        cache = SingleFlightCache("test")
+
+        def compute():
+            cache.invalidate(1)
+            return "before-write"
+
+        self.assertEqual(cache.get(1, compute), "before-write")
+        self.assertEqual(cache.get(1, lambda: "after-write"), "after-write")
+
+    def test_missing_result_drops_stale_entry(self):
+        cache = SingleFlightCache("test", fresh_ttl=0, stale_ttl=60)
+        cache.get(1, lambda: "old")
+        self.assertIsNone(cache.get(1, lambda: None))
+        self.assertNotIn(1, cache._entries)
+
+    def test_shared_mode_invalidation(self):
+        cache = SingleFlightCache("test-shared", shared=True)
+        self.assertEqual(cache.get(1, lambda: "a"), "a")
+        self.assertEqual(cache.get(1, lambda: "b"), "a")
+        cache.invalidate(1)
+        self.assertEqual(cache.get(1, lambda: "b"), "b")
+
+
+@override_settings(DETAIL_CACHE_ENABLED=True)
+class PostDetailCacheTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author", password="pw")
+        cls.reader = User.objects.create_user(username="reader", password="pw")
+        for user in (cls.author, cls.reader):
+            Profile.objects.create(user=user, profilename=user.username, email=f"{user.username}@example.com")
+        cls.post = Post.objects.create(owner=cls.author, content="first")
+
+    def setUp(self):
+        get_detail_cache("post").clear()
+        self.url = f"/api/posts/{self.post.id}/"
+
+    def test_viewer_fields_are_not_shared(self):
+        self.client.force_authenticate(self.author)
+        self.assertTrue(self.client.get(self.url).json()["isOwner"])
+        self.client.force_authenticate(self.reader)
+        self.client.patch(self.url)
+        body = self.client.get(self.url).json()
+        self.assertFalse(body["isOwner"])
+        self.assertTrue(body["isLiked"])
+        self.assertEqual(body["likes_count"], 1)
+
+    def test_delete_invalidates(self):
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.delete(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_edit_invalidates(self):
+        self.client.force_authenticate(self.author)
+        self.client.get(self.url)
+        self.client.put(self.url, {"content": "second"}, format="json")
+        self.assertEqual(self.client.get(self.url).json()["content"], "second")
+
+
+@override_settings(DETAIL_CACHE_ENABLED=True)
+class PostVersionTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author", password="pw")
+        cls.other = User.objects.create_user(username="other", password="pw")
+        for user in (cls.author, cls.other):
+            Profile.objects.create(user=user, profilename=user.username, email=f"{user.username}@example.com")
+
+    def setUp(self):
+        get_detail_cache("post").clear()
+        self.post = Post.objects.create(owner=self.author, content="v1")
+        self.url = f"/api/posts/{self.post.id}/"
+        self.client.force_authenticate(self.author)
+
+    def test_etag_follows_version(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["ETag"], '"1"')
+        response = self.client.put(self.url, {"content": "v2"}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+        self.assertEqual(self.client.get(self.url).json()["content"], "v2")
+
+    def test_stale_if_match_is_rejected(self):
+        self.client.put(self.url, {"content": "v2"}, format="json", HTTP_IF_MATCH='"1"')
+        response = self.client.put(self.url, {"content": "lost"}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response["ETag"], '"2"')
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.content, self.post.version), ("v2", 2))
+        self.assertEqual(PostRevision.objects.filter(post=self.post).count(), 1)
+
+    def test_edit_reads_nothing_first(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(edit_post(self.post.id, self.author, "v2", [1]))
+        statements = [q["sql"].split()[0] for q in ctx.captured_queries]
+        self.assertEqual([s for s in statements if s in ("INSERT", "UPDATE", "SELECT")], ["INSERT", "UPDATE"])
+
+    def test_non_owner_is_forbidden(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.put(self.url, {"content": "x"}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 403)
+
+    def test_edit_without_if_match_survives_a_concurrent_edit(self):
+        real_edit_post = edit_post
+
+        def edit_after_another(pk, editor, content, versions):
+            if not Post.objects.filter(pk=pk, content="other").exists():
+                real_edit_post(pk, editor, "other", versions)
+            return real_edit_post(pk, editor, content, versions)
+
+        with mock.patch("api.views.edit_post", side_effect=edit_after_another):
+            response = self.client.put(self.url, {"content": "mine"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"3"')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content, "mine")
+
+    def test_missing_or_foreign_post_is_checked_before_the_body(self):
+        response = self.client.put("/api/posts/999999/", {"content": ""}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(self.other)
+        response = self.client.put(self.url, {"content": ""}, format="json")
+        self.assertEqual(response.status_code, 403)
+
+    def test_history_lists_superseded_versions(self):
+        for version, content in enumerate(["v2", "v3"], start=1):
+            self.client.put(self.url, {"content": content}, format="json", HTTP_IF_MATCH=f'"{version}"')
+        body = self.client.get(f"{self.url}history/").json()
+        self.assertEqual([(r["version"], r["content"]) for r in body["results"]], [(2, "v2"), (1, "v1")])
+
+
+class AccountDeletionTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        def make(name):
+            user = User.objects.create_user(username=name, password="pw")
+            Profile.objects.create(user=user, profilename=name, email=f"{name}@example.com")
+            return user
+
+        cls.gone, cls.friend = make("gone"), make("friend")
+        cls.posts = [Post.objects.create(owner=cls.gone, content=str(i)) for i in range(5)]
+        cls.friend_post = Post.objects.create(owner=cls.friend, content="stays")
+        for post in cls.posts:
+            Like.objects.create(post=post, owner=cls.friend)
+        Like.objects.create(post=cls.friend_post, owner=cls.gone)
+        Follow.objects.create(followed=cls.friend.profile, follower=cls.gone.profile)
+        Follow.objects.create(followed=cls.gone.profile, follower=cls.friend.profile)
+
+    def test_schedule_disables_immediately_and_is_idempotent(self):
+        job = schedule_account_deletion(self.gone)
+        self.assertEqual(schedule_account_deletion(self.gone).id, job.id)
+        self.gone.refresh_from_db()
+        self.assertFalse(self.gone.is_active)
+
+        self.client.force_authenticate(self.friend)
+        self.assertEqual(self.client.get(f"/api/posts/{self.posts[0].id}/").status_code, 404)
+        self.assertEqual(self.client.patch(f"/api/posts/{self.posts[0].id}/").status_code, 404)
+        post = self.client.get(f"/api/posts/{self.friend_post.id}/").json()
+        self.assertEqual(post["likes_count"], 0)
+        profile = self.client.get(f"/api/profile/{self.friend.profile.id}/").json()
+        self.assertEqual((profile["followers_count"], profile["following_count"]), (0, 0))
+
+    def test_purge_removes_everything_in_batches(self):
+        job = purge_account(schedule_account_deletion(self.gone).id, batch_size=2)
+        self.assertEqual(job.status, AccountDeletion.DONE)
+        self.assertEqual((job.posts_deleted, job.likes_deleted, job.follows_deleted), (5, 6, 2))
+        self.assertFalse(User.objects.filter(id=self.gone.id).exists())
+        self.assertFalse(Post.objects.filter(owner_id=self.gone.id).exists())
+        self.assertTrue(Post.objects.filter(id=self.friend_post.id).exists())
+        self.assertEqual(Follow.objects.count(), 0)
+
+    def test_purge_batches_post_revisions(self):
+        for version in range(1, 6):
+            PostRevision.objects.create(
+                post=self.posts[0], version=version, content="old",
+                created_at=timezone.now(), replaced_at=timezone.now(),
+            )
+        job = schedule_account_deletion(self.gone)
+        with CaptureQueriesContext(connection) as ctx:
+            purge_account(job.id, batch_size=2)
+        # Removed by id in batches of 2, before the posts' cascade runs.
+        batched = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith('DELETE FROM "api_postrevision" WHERE "api_postrevision"."id" IN')
+        ]
+        self.assertEqual(len(batched), 3)
+        self.assertFalse(PostRevision.objects.exists())
+
+    def test_failed_purge_resumes(self):
+        job = schedule_account_deletion(self.gone)
+        with mock.patch("api.deletion.Follow.objects.filter", side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                purge_account(job.id, batch_size=2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AccountDeletion.FAILED)
+        self.assertEqual(job.posts_deleted, 5)
+
+        job = purge_account(job.id, batch_size=2)
+        self.assertEqual(job.status, AccountDeletion.DONE)
+        self.assertEqual((job.posts_deleted, job.follows_deleted), (5, 2))
+        self.assertFalse(User.objects.filter(id=self.gone.id).exists())
+
+
+class LikeBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="liker", password="pw")
+        cls.post = Post.objects.create(owner=cls.user, content="post")
+
+    def setUp(self):
+        self.buffer = LikeBuffer(max_pending=1000, flush_interval=3600)
+        self.buffer._ensure_flusher = lambda: None  # flush by hand only
+
+    def test_repeated_toggles_collapse(self):
+        self.assertTrue(self.buffer.toggle(self.post.id, self.user.id))
+        self.assertFalse(self.buffer.toggle(self.post.id, self.user.id))
+        self.assertEqual(self.buffer.count_delta(self.post.id), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_overlay_until_flushed(self):
+        self.buffer.toggle(self.post.id, self.user.id)
+        self.assertTrue(self.buffer.is_liked(self.post.id, self.user.id, False))
+        self.assertEqual(self.buffer.count_delta(self.post.id), 1)
+        self.assertFalse(Like.objects.exists())
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertTrue(Like.objects.filter(post=self.post, owner=self.user).exists())
+        self.assertEqual(self.buffer.count_delta(self.post.id), 0)
+
+        self.buffer.toggle(self.post.id, self.user.id)
+        self.assertEqual(self.buffer.count_delta(self.post.id), -1)
+        self.buffer.flush()
+        self.assertFalse(Like.objects.exists())
+
+    def test_failed_flush_restores_entries(self):
+        self.buffer.toggle(self.post.id, self.user.id)
+        with mock.patch.object(self.buffer, "_write", side_effect=DatabaseError("down")):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.count_delta(self.post.id), 1)
+        self.buffer.flush()
+        self.assertTrue(Like.objects.filter(post=self.post, owner=self.user).exists())
+
+    def test_failed_flush_merges_with_newer_toggle(self):
+        self.buffer.toggle(self.post.id, self.user.id)
+
+        def toggle_back_then_fail(batch):
+            self.buffer.toggle(self.post.id, self.user.id)
+            raise DatabaseError("down")
+
+        with mock.patch.object(self.buffer, "_write", side_effect=toggle_back_then_fail):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.count_delta(self.post.id), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_toggle_rereads_after_concurrent_flush(self):
+        real_filter = Like.objects.filter
+        raced = []
+
+        def racing_filter(*args, **kwargs):
+            queryset = real_filter(*args, **kwargs)
+            if raced:
+                return queryset
+            raced.append(True)
+            stale = queryset.exists()
+            # Another request likes the post and it is flushed meanwhile.
+            self.buffer.toggle(self.post.id, self.user.id)
+            self.buffer.flush()
+            return mock.Mock(exists=lambda: stale)
+
+        with mock.patch.object(Like.objects, "filter", side_effect=racing_filter):
+            self.assertFalse(self.buffer.toggle(self.post.id, self.user.id))
+        self.buffer.flush()
+        self.assertFalse(Like.objects.exists())
+
+    def test_launcher_refuses_several_workers(self):
+        config = load_gunicorn_config()
+        server = SimpleNamespace(cfg=SimpleNamespace(workers=3), log=mock.Mock())
+        with override_settings(LIKE_WRITE_BEHIND=True):
+            with self.assertRaises(RuntimeError):
+                config["on_starting"](server)
+            server.cfg.workers = 1
+            config["on_starting"](server)
+        with override_settings(LIKE_WRITE_BEHIND=False):
+            server.cfg.workers = 3
+            config["on_starting"](server)
+
+
+class MetricsTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="metrics", password="pw")
+        Profile.objects.create(user=cls.user, profilename="metrics", email="m@example.com")
+        cls.post = Post.objects.create(owner=cls.user, content="post")
+
+    def setUp(self):
+        registry.reset()
+        self.client.force_authenticate(self.user)
+
+    def test_serialization_is_timed_separately_from_rendering(self):
+        self.client.get(f"/api/posts/{self.post.id}/")
+        stats = registry._routes[("api/posts/<int:pk>/", "GET")]
+        self.assertGreater(stats.serialize_seconds, 0)
+        self.assertGreater(stats.render_seconds, 0)
+        self.assertIn("api_serialize_seconds_total", registry.render_prometheus())
+
+    def test_scrape_sums_every_worker(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        metrics_settings = override_settings(METRICS_DIR=directory.name)
+        metrics_settings.enable()
+        self.addCleanup(metrics_settings.disable)
+
+        def requests_total():
+            line = next(
+                line for line in registry.render_prometheus().splitlines()
+                if line.startswith('api_requests_total{route="posts/"')
+            )
+            return int(line.rsplit(" ", 1)[1])
+
+        other = MetricsRegistry()
+        for _ in range(3):
+            other.record("posts/", "GET", 200, 1, 0.001, 0.0, 0.0, 0.01)
+        registry.record("posts/", "GET", 200, 1, 0.001, 0.0, 0.0, 0.01)
+        as_other_worker = mock.patch("api.metrics.os.getpid", return_value=999999)
+        with as_other_worker:
+            other.flush()
+        self.assertEqual(requests_total(), 4)
+        with as_other_worker:
+            other.fold_into_archive()
+        self.assertNotIn("999999.json", os.listdir(directory.name))
+        self.assertEqual(requests_total(), 4)
+
+    def test_nested_serializers_are_counted_once(self):
+        class Echo(serializers.Serializer):
+            def to_representation(self, instance):
+                return instance
+
+        class Inner(TimedSerializerMixin, Echo):
+            pass
+
+        class Wrap(serializers.Serializer):
+            def to_representation(self, instance):
+                return {"inner": Inner().to_representation(instance)}
+
+        class Outer(TimedSerializerMixin, Wrap):
+            pass
+
+        start_serialize_clock()
+        with mock.patch("api.metrics.time.perf_counter", side_effect=[0.0, 10.0]):
+            Outer().to_representation("x")
+        self.assertEqual(serialize_seconds(), 10.0)
+
+
+class ExportTests(TestCase):
+    client_class = APIClient
+    url = "/api/profile/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="exporter", password="pw")
+        cls.profile = Profile.objects.create(user=cls.user, profilename="exporter", email="e@example.com")
+        cls.other = User.objects.create_user(username="other", password="pw")
+        other_profile = Profile.objects.create(user=cls.other, profilename="other", email="o@example.com")
+        cls.profile.follow(other_profile)
+        cls.post = Post.objects.create(owner=cls.user, content="mine")
+        Like.objects.create(post=cls.post, owner=cls.user)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.client.force_authenticate(self.user)
+
+    def records(self, data):
+        return [json.loads(line) for line in data.decode().splitlines()]
+
+    def test_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = self.records(b"".join(response.streaming_content))
+        self.assertEqual(
+            [record["type"] for record in records], ["profile", "post", "like", "following"]
+        )
+        self.assertEqual(records[0]["email"], "e@example.com")
+        self.assertEqual(records[1]["content"], "mine")
+
+    def test_gzip(self):
+        response = self.client.get(self.url, {"compression": "gzip"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn(".ndjson.gz", response["Content-Disposition"])
+        records = self.records(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(records[-1]["profilename"], "other")
+
+    def test_async_job(self):
+        job = self.client.get(self.url, {"mode": "async"}).json()["job"]
+        self.assertEqual(self.client.get(self.url, {"job": job}).status_code, 202)
+
+        Worker(name="test-worker", schedules=False).run(once=True)
+        response = self.client.get(self.url, {"job": job})
+        self.assertEqual(response.json()["status"], "done")
+        download = self.client.get(response.json()["url"])
+        self.assertEqual(download.status_code, 200)
+        records = self.records(gzip.decompress(b"".join(download.streaming_content)))
+        self.assertEqual(records[0]["username"], "exporter")
+
+        stored = Task.objects.get(id=job).result
+        self.assertNotIn("exporter", stored)
+
+    def test_concurrent_jobs_get_their_own_archives(self):
+        jobs = [self.client.get(self.url, {"mode": "async"}).json()["job"] for _ in range(2)]
+        Worker(name="test-worker", schedules=False).run(once=True)
+        names = {Task.objects.get(id=job).result for job in jobs}
+        self.assertEqual(len(names), 2)
+
+    def test_failed_job(self):
+        job = self.client.get(self.url, {"mode": "async"}).json()["job"]
+        Task.objects.filter(id=job).update(status=Task.FAILED)
+        response = self.client.get(self.url, {"job": job})
+        self.assertEqual(response.json()["status"], "failed")
+
+    def test_unknown_or_foreign_job_is_404(self):
+        job = self.client.get(self.url, {"mode": "async"}).json()["job"]
+        self.assertEqual(self.client.get(self.url, {"job": job + 1}).status_code, 404)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url, {"job": job}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {"job": "../x"}).status_code, 400)
+
+
+class BulkImportTests(TestCase):
+    client_class = APIClient
+    url = "/api/posts/bulk/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="importer", password="pw")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def post_body(self, body, content_type, query=""):
+        return self.client.generic("POST", self.url + query, body, content_type=content_type)
+
+    def test_json_list(self):
+        response = self.client.post(self.url, [{"content": "a"}, {"content": "b"}], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(Post.objects.filter(owner=self.user).count(), 2)
+
+    def test_ndjson(self):
+        body = '{"content": "a"}\n\n{"content": "b"}\n'
+        response = self.post_body(body, "application/x-ndjson")
+        self.assertEqual(response.json()["created"], 2)
+
+    def test_csv(self):
+        body = "content\nfirst\n\"second, with comma\"\n"
+        response = self.post_body(body, "text/csv")
+        self.assertEqual(response.json()["created"], 2)
+        self.assertTrue(Post.objects.filter(content="second, with comma").exists())
+
+    def test_errors_are_reported_per_row_in_order(self):
+        body = '{"content": ""}\nnot json\n{"content": "ok"}\n[1]\n'
+        result = self.post_body(body, "application/x-ndjson").json()
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["failed"], 3)
+        self.assertEqual([error["row"] for error in result["errors"]], [1, 2, 4])
+        self.assertIn("content", result["errors"][0]["errors"])
+
+    def test_malformed_owner_is_a_row_error(self):
+        rows = [
+            {"content": "a", "owner_username": ["importer"]},
+            {"content": "b", "owner": {"id": 1}},
+            {"content": "c", "owner_username": "importer"},
+            {"content": "d", "owner": self.user.id},
+        ]
+        importer = PostImporter(batch_size=10)
+        result = importer.run(iter_rows(rows))
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(
+            [(error["row"], list(error["errors"])) for error in result["errors"]],
+            [(1, ["owner_username"]), (2, ["owner"])],
+        )
+
+    def test_failed_batch_rolls_back_only_itself(self):
+        real_bulk_create = Post.objects.bulk_create
+        calls = []
+
+        def fail_second_batch(posts, **kwargs):
+            calls.append(posts)
+            if len(calls) == 2:
+                Post.objects.create(owner=self.user, content="partial")  # rolled back
+                raise DatabaseError("disk full")
+            return real_bulk_create(posts, **kwargs)
+
+        rows = [{"content": str(i)} for i in range(5)]
+        with mock.patch.object(Post.objects, "bulk_create", side_effect=fail_second_batch):
+            result = self.client.post(self.url + "?batch_size=2", rows, format="json").json()
+        self.assertEqual(result["created"], 3)
+        self.assertEqual([error["row"] for error in result["errors"]], [3, 4])
+        self.assertEqual(
+            sorted(Post.objects.filter(owner=self.user).values_list("content", flat=True)),
+            ["0", "1", "4"],
+        )
+
+
+@override_settings(
+    THROTTLE_ENABLED=True,
+    THROTTLE_DB_MS_PER_TOKEN=1000,  # test queries stay well inside the up-front token
+    THROTTLE_BUCKETS={
+        "user": {"capacity": 100, "refill_rate": 1.0},
+        "feed": {"capacity": 3, "refill_rate": 0.5},
+        "profile_search": {"capacity": 4, "refill_rate": 1.0},
+    },
+)
+class ThrottlingTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="throttled", password="pw")
+        Profile.objects.create(user=cls.user, profilename="throttled", email="t@example.com")
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_authenticate(self.user)
+        self.now = 1_000_000.0
+        clock = mock.patch("api.throttling.time.time", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def statuses(self, url, n):
+        return [self.client.get(url).status_code for _ in range(n)]
+
+    def test_bucket_allows_capacity_then_refills(self):
+        self.assertEqual(self.statuses("/api/posts/", 4), [200, 200, 200, 429])
+        self.now += 1.9  # 0.95 tokens at 0.5/s
+        self.assertEqual(self.statuses("/api/posts/", 1), [429])
+        self.now += 0.1
+        self.assertEqual(self.statuses("/api/posts/", 2), [200, 429])
+
+    def test_cheap_requests_get_the_full_capacity(self):
+        # The up-front token covers a request's first THROTTLE_DB_MS_PER_TOKEN
+        # ms of DB time, so fractional charges don't eat the last token.
+        self.assertEqual(self.statuses("/api/profile/?search=thr", 5), [200] * 4 + [429])
+
+    def test_feed_and_search_budgets_are_separate(self):
+        self.assertEqual(self.statuses("/api/profile/?search=thr", 5)[-1], 429)
+        self.assertEqual(self.statuses("/api/posts/", 3), [200, 200, 200])
+        self.assertEqual(self.statuses("/api/profile/", 1), [200])
+
+    @override_settings(THROTTLE_DB_MS_PER_TOKEN=0.001)
+    def test_db_time_is_charged_to_the_bucket(self):
+        # Any query costs far more than a token, so the first request
+        # drains the search bucket into debt and the next one is refused.
+        self.assertEqual(self.statuses("/api/profile/?search=thr", 2), [200, 429])
+        throttle = ProfileSearchRateThrottle()
+        throttle.key = f"throttle:profile_search:user:{self.user.pk}"
+        self.assertEqual(throttle._load(self.now), -throttle.capacity)
+
+    def test_charge_scales_with_db_time(self):
+        throttle = ProfileSearchRateThrottle()
+        throttle.key = "throttle:profile_search:test"
+        throttle._store(4.0, self.now)
+        with override_settings(THROTTLE_DB_MS_PER_TOKEN=50):
+            throttle.charge(120 / 50)  # 120 ms of DB time
+        self.assertAlmostEqual(throttle._load(self.now), 1.6)
+
+    def test_launcher_warns_about_per_process_buckets(self):
+        config = load_gunicorn_config()
+        server = SimpleNamespace(cfg=SimpleNamespace(workers=3), log=mock.Mock())
+        config["on_starting"](server)
+        server.log.warning.assert_called_once()
+        server.cfg.workers = 1
+        config["on_starting"](server)
+        server.log.warning.assert_called_once()
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionTests(TestCase):
+    body = json.dumps({"content": "x" * 500}).encode()
+
+    def run_middleware(self, response, accept_encoding="gzip"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        with mock.patch("api.middleware.brotli", None):
+            return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, body=None, **headers):
+        response = HttpResponse(body or self.body, content_type="application/json")
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def test_large_json_is_gzipped(self):
+        response = self.run_middleware(self.json_response())
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_body_is_left_alone_but_varies(self):
+        response = self.run_middleware(self.json_response(b'{"ok": true}'))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_q_values_are_respected(self):
+        for header in ("gzip;q=0", "identity", "br, *;q=0", ""):
+            with self.subTest(header=header):
+                response = self.run_middleware(self.json_response(), header)
+                self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.run_middleware(self.json_response(), "identity;q=1, *;q=0.5")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_etag_is_weakened(self):
+        response = self.run_middleware(self.json_response(ETag='"3"'))
+        self.assertEqual(response["ETag"], 'W/"3"')
+
+    def test_streaming_and_encoded_responses_are_untouched(self):
+        streaming = StreamingHttpResponse(iter([self.body]), content_type="application/json")
+        self.assertFalse(self.run_middleware(streaming).has_header("Content-Encoding"))
+        encoded = self.json_response(**{"Content-Encoding": "gzip"})
+        self.assertEqual(self.run_middleware(encoded).content, self.body)
+
+    def test_other_content_types_are_untouched(self):
+        response = HttpResponse(self.body, content_type="text/plain")
+        self.assertFalse(self.run_middleware(response).has_header("Content-Encoding"))
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(
+            parse_accept_encoding("gzip;q=0.8, BR, *;q=bad"),
+            {"gzip": 0.8, "br": 1.0, "*": 0.0},
+        )
+
+
+class NormalizedFeedTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        def make(name):
+            user = User.objects.create_user(username=name, password="pw")
+            Profile.objects.create(user=user, profilename=name, email=f"{name}@example.com")
+            return user
+
+        cls.reader = make("reader")
+        cls.authors = [make(f"author{i}") for i in range(4)]
+        for author in cls.authors:
+            Follow.objects.create(followed=author.profile, follower=cls.reader.profile)
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def feed(self):
+        with CaptureQueriesContext(connection) as ctx:
+            body = self.client.get("/api/posts/?shape=normalized").json()
+        return body, len(ctx.captured_queries)
+
+    def test_authors_sent_once_per_page(self):
+        for i, author in enumerate(self.authors):
+            Post.objects.create(owner=author, content=str(i))
+        body, _ = self.feed()
+        self.assertEqual(set(body["authors"]), {str(a.id) for a in self.authors})
+        self.assertEqual(body["authors"][str(self.authors[0].id)]["username"], "author0")
+        self.assertNotIn("owner_username", body["results"][0])
+
+    def test_author_map_costs_one_query_however_many_authors(self):
+        posts = [Post.objects.create(owner=self.authors[0], content=str(i)) for i in range(4)]
+        _, one_author = self.feed()
+        for post, author in zip(posts, self.authors):
+            Post.objects.filter(id=post.id).update(owner=author)
+        body, four_authors = self.feed()
+        self.assertEqual(len(body["authors"]), 4)
+        self.assertEqual(one_author, four_authors)
+
+
+class ReadinessTests(TestCase):
+    def test_database_error_details_are_not_exposed(self):
+        with mock.patch("api.views.connection.cursor", side_effect=DatabaseError("secret dsn")):
+            with self.assertLogs("api.views", "ERROR"):
+                response = self.client.get("/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {"status": "unavailable"})
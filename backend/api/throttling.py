@@ -0,0 +1,107 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token-bucket throttle keyed by user (or client IP when anonymous).
+
+    Each scope has its own bucket, configured in `THROTTLE_BUCKETS` as
+    `{"capacity": <burst>, "refill_rate": <tokens per second>}`. A request
+    takes one token up front; `RequestCostMiddleware` later charges extra
+    tokens for DB time beyond what that token covers, so expensive calls
+    drain the bucket faster. Buckets live in the cache named by `THROTTLE_CACHE`.
+
+    Like DRF's own SimpleRateThrottle the read-modify-write on the cache is
+    not atomic, so concurrent requests can slightly overshoot a limit.
+    """
+    scope = "user"
+
+    def __init__(self):
+        self.bucket = settings.THROTTLE_BUCKETS[self.scope]
+        self.capacity = float(self.bucket["capacity"])
+        self.refill_rate = float(self.bucket["refill_rate"])
+        self.key = None
+        self.tokens = None
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "THROTTLE_CACHE", "default")]
+
+    def applies(self, request, view):
+        """Override to only throttle some requests handled by a view."""
+        return True
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return f"throttle:{self.scope}:{ident}"
+
+    def _load(self, now):
+        tokens, updated = self.cache.get(self.key, (self.capacity, now))
+        elapsed = max(0.0, now - updated)
+        return min(self.capacity, tokens + elapsed * self.refill_rate)
+
+    def _store(self, tokens, now):
+        # Keep the entry until the bucket would be full again anyway.
+        timeout = int((self.capacity - tokens) / self.refill_rate) + 1
+        self.cache.set(self.key, (tokens, now), max(1, timeout))
+
+    def allow_request(self, request, view):
+        if not getattr(settings, "THROTTLE_ENABLED", True):
+            return True
+        if not self.applies(request, view):
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        now = time.time()
+        self.tokens = self._load(now)
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        self._store(self.tokens, now)
+        # Let RequestCostMiddleware charge this bucket for DB time.
+        charged = getattr(request._request, "throttle_buckets", [])
+        charged.append(self)
+        request._request.throttle_buckets = charged
+        return True
+
+    def charge(self, cost):
+        """Take `cost` extra tokens; the bucket may go into debt."""
+        if cost <= 0 or self.key is None:
+            return
+        now = time.time()
+        tokens = self._load(now) - cost
+        self._store(max(tokens, -self.capacity), now)
+
+    def wait(self):
+        if self.tokens is None:
+            return None
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    """Overall per-user budget shared by every API endpoint."""
+    scope = "user"
+
+
+class FeedRateThrottle(TokenBucketThrottle):
+    """Separate budget for reading the `posts/` feed."""
+    scope = "feed"
+
+    def applies(self, request, view):
+        return request.method == "GET"
+
+
+class ProfileSearchRateThrottle(TokenBucketThrottle):
+    """Separate budget for search-as-you-type on `profile/?search=`."""
+    scope = "profile_search"
+
+    def applies(self, request, view):
+        return request.method == "GET" and bool(request.query_params.get("search"))
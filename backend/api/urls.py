@@ -4,9 +4,15 @@ from . import views
 urlpatterns = [
     path("user/", views.UserAPIView.as_view(), name="register_user"),
     path("profile/", views.ProfileAPIView.as_view(), name="my_profile"),
+    path("profile/export/", views.ProfileExportAPIView.as_view(), name="profile_export"),
     path("profile/<int:id>/", views.ProfileAPIView.as_view(), name="other_profile"),
     path("profile/<int:id>/follow/", views.FollowAPIView.as_view(), name="follow_profile"),
+    path("profile/<int:id>/followers/", views.FollowersAPIView.as_view(), name="profile_followers"),
+    path("profile/<int:id>/following/", views.FollowingAPIView.as_view(), name="profile_following"),
+    path("profile/<int:id>/mutual/", views.MutualFollowersAPIView.as_view(), name="profile_mutual"),
     
     path("posts/", views.PostAPIView.as_view(), name="post_list_create"),
+    path("posts/bulk/", views.PostBulkAPIView.as_view(), name="post_bulk_create"),
     path("posts/<int:pk>/", views.PostDetailAPIView.as_view(), name="post_detail"),
+    path("posts/<int:pk>/history/", views.PostHistoryAPIView.as_view(), name="post_history"),
 ]
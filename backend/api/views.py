@@ -1,19 +1,44 @@
-from django.shortcuts import render
+import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth.models import User
-from django.db.models import Q
-from rest_framework.exceptions import PermissionDenied
+from django.db import DatabaseError, connection
+from django.db.models import Exists, OuterRef, Q, Value
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.utils.urls import replace_query_param
 from sqlite3 import IntegrityError
 from rest_framework.pagination import PageNumberPagination
 from .serializers import (
     UserSerializer,
     PostSerializer,
     ProfileSerializer,
+    CompactPostSerializer,
+    FollowerSerializer,
+    FollowingSerializer,
+    PostRevisionSerializer,
+    author_map,
+    get_like_buffer,
+    viewer_post_fields,
+    viewer_profile_fields,
 )
-from .models import Post, Profile, Like
+from .models import Follow, Post, PostRevision, Profile, Like
+from .revisions import ANY, edit_post, etag_for, parse_if_match
+from .metrics import registry
+from .singleflight import get_detail_cache, invalidate_detail
+from .throttling import FeedRateThrottle, ProfileSearchRateThrottle, UserRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# Modules used by a single endpoint (bulk import, export, deletion and the
+# task queue) are imported inside that endpoint, so API workers don't load
+# them at startup.
+
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 10
@@ -21,6 +46,59 @@ class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 20
     
+class FollowKeysetPagination:
+    """
+    Keyset pagination over Follow edges, newest first. The cursor is the
+    (created_at, id) of the last edge on the page, so every page is an
+    index range scan on (profile, created_at) with no OFFSET.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            page_size = self.page_size
+        page_size = max(1, min(page_size, self.max_page_size))
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, last_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id)
+            )
+        rows = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def encode_cursor(self, edge):
+        raw = f"{edge.created_at.isoformat()}|{edge.id}"
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, last_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            parsed = datetime.fromisoformat(created_at)
+            return parsed, int(last_id)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor.")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
 class UserAPIView(APIView):
     permission_classes = [AllowAny]
 
@@ -75,19 +153,37 @@ class UserAPIView(APIView):
 
 class PostAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [UserRateThrottle, FeedRateThrottle]
 
     def get(self, request):
-        user = request.user
-        following_profiles = user.profile.following.all()
-        posts_qs = Post.objects.filter(
-            Q(owner__profile__in=following_profiles) | Q(owner=user)
-        ).order_by('-created_at')
-
+        """
+        The authenticated user's feed: their own posts and those of the
+        profiles they follow, newest first. `?shape=normalized` sends each
+        author once in an `authors` map instead of on every post.
+        """
+        posts_qs = self.feed_queryset(request.user)
         paginator = CustomPageNumberPagination()
         paginated_posts = paginator.paginate_queryset(posts_qs, request)
+        if request.query_params.get('shape') == 'normalized':
+            # Each author once per page instead of repeated on every post.
+            serializer = CompactPostSerializer(paginated_posts, many=True, context={'request': request})
+            response = paginator.get_paginated_response(serializer.data)
+            response.data['authors'] = author_map(paginated_posts)
+            return response
         serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
         return paginator.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def feed_queryset(user):
+        """The posts in `user`'s feed, newest first."""
+        # Filter on owner_id directly so each followed user's posts come
+        # from the (owner, created_at) index instead of a profile join.
+        following_user_ids = user.profile.following.values('user_id')
+        return Post.objects.filter(
+            Q(owner_id__in=following_user_ids) | Q(owner=user),
+            owner__is_active=True,
+        ).order_by('-created_at')
+
     def post(self, request):
         """
         Create a new post (owned by the current user).
@@ -102,8 +198,52 @@ class PostAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PostBulkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 1000
+
+    def post(self, request):
+        """
+        Create many posts (owned by the current user) in one request.
+        Accepts a JSON list, NDJSON (application/x-ndjson) or CSV (text/csv)
+        with a `content` column. NDJSON/CSV bodies are streamed line by line.
+        Invalid rows are reported per row and do not abort the import.
+        """
+        from .bulk import DEFAULT_BATCH_SIZE, PostImporter, iter_csv, iter_ndjson, iter_rows
+
+        try:
+            batch_size = int(request.query_params.get("batch_size", DEFAULT_BATCH_SIZE))
+        except ValueError:
+            return Response(
+                {"error": "batch_size must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        batch_size = max(1, min(batch_size, self.max_batch_size))
+
+        content_type = request.content_type.split(";")[0].strip()
+        if content_type in ("application/x-ndjson", "application/jsonl"):
+            rows = iter_ndjson(request._request)
+        elif content_type == "text/csv":
+            rows = iter_csv(request._request)
+        else:
+            if not isinstance(request.data, list):
+                return Response(
+                    {"error": "Expected a list of posts."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            rows = iter_rows(request.data)
+
+        importer = PostImporter(owner=request.user, batch_size=batch_size)
+        result = importer.run(rows)
+        response_status = (
+            status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST
+        )
+        return Response(result, status=response_status)
+
+
 class ProfileAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [UserRateThrottle, ProfileSearchRateThrottle]
 
     def get(self, request, id=None):
         """
@@ -116,20 +256,23 @@ class ProfileAPIView(APIView):
 
         if id:
             # Retrieve a specific profile by ID
-            try:
-                profile = Profile.objects.get(id=id)
-            except Profile.DoesNotExist:
+            cache = get_detail_cache("profile")
+            if cache is None:
+                data = self.serialize_profile(id, request)
+            else:
+                data = cache.get(id, lambda: self.serialize_profile(id, request))
+            if data is None:
                 return Response(
                     {"error": "Profile not found."}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
-            serializer = ProfileSerializer(profile, context={"request": request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(viewer_profile_fields(data, request), status=status.HTTP_200_OK)
 
         elif search_query:
             # Search for profiles matching the query
             profiles = Profile.objects.filter(
-                profilename__icontains=search_query
+                profilename__icontains=search_query,
+                user__is_active=True,
             )[:4]
             serializer = ProfileSerializer(
                 profiles, 
@@ -151,6 +294,14 @@ class ProfileAPIView(APIView):
             serializer = ProfileSerializer(profile, context={"request": request})
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def serialize_profile(self, id, request):
+        """Shared (viewer-independent) representation of a profile, or None."""
+        try:
+            profile = Profile.objects.select_related('user').get(id=id, user__is_active=True)
+        except Profile.DoesNotExist:
+            return None
+        return dict(ProfileSerializer(profile, context={"request": request}).data)
+
     def put(self, request):
         """
         Update the authenticated user's Profile fields (and possibly User.email).
@@ -187,6 +338,7 @@ class ProfileAPIView(APIView):
         )
         if serializer.is_valid():
             serializer.save()
+            invalidate_detail("profile", profile.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -216,22 +368,96 @@ class ProfileAPIView(APIView):
 
     def delete(self, request):
         """
-        Delete the authenticated user's profile.
-        (For many apps, you might prefer to deactivate rather than delete.)
+        Delete the authenticated user's account.
+        The account is disabled right away; posts, likes and follow edges
+        are purged in bounded batches in the background.
         """
         user = request.user
-        try:
-            profile = Profile.objects.get(user=user)
-        except Profile.DoesNotExist:
+        if not Profile.objects.filter(user=user).exists():
             return Response(
                 {"error": "Profile not found."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        profile.delete()
+        from . import tasks
+        from .deletion import schedule_account_deletion
+
+        job = schedule_account_deletion(user)
+        tasks.purge_account.enqueue(job.id)
+        invalidate_detail("profile", user.profile.id)
+        return Response(
+            {"message": "Profile deletion scheduled.", "job": job.id},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class ProfileExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Export the authenticated user's posts, likes and follow lists as NDJSON.
+        - `?compression=gzip` streams a gzip archive instead of plain NDJSON.
+        - `?mode=async` queues a task that writes the gzip archive to media
+          storage and returns a job id to poll with `?job=<id>`. Once the
+          job is done, `?job=<id>&download=1` returns the archive.
+        """
+        from .exports import export_filename, gzip_stream, iter_export_lines
+
+        user = request.user
+        job = request.query_params.get("job")
+        if job:
+            return self.job_status(request, job)
+
+        if request.query_params.get("mode") == "async":
+            from . import tasks
+            queued = tasks.write_export_archive.enqueue(user.id)
+            return Response(
+                {"job": queued.id, "status": "pending"},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        compress = request.query_params.get("compression") == "gzip"
+        lines = iter_export_lines(user)
+        filename = export_filename(user, gzip=compress)
+        if compress:
+            response = StreamingHttpResponse(gzip_stream(lines), content_type="application/gzip")
+        else:
+            response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def job_status(self, request, job):
+        """Report on an async export job of the authenticated user, or download its archive."""
+        from django.core.files.storage import default_storage
+        from django.http import FileResponse
+        from . import tasks
+        from .exports import export_filename
+        from .models import Task
+
+        if not job.isdigit():
+            return Response({"error": "Invalid job."}, status=status.HTTP_400_BAD_REQUEST)
+        task = Task.objects.filter(id=job, name=tasks.write_export_archive.name).first()
+        if task is None or task.args[:1] != [request.user.id]:
+            return Response({"error": "Export not found."}, status=status.HTTP_404_NOT_FOUND)
+        if task.status == Task.FAILED:
+            return Response({"job": task.id, "status": "failed"}, status=status.HTTP_200_OK)
+        if task.status != Task.DONE:
+            return Response({"job": task.id, "status": "pending"}, status=status.HTTP_202_ACCEPTED)
+        if not task.result or not default_storage.exists(task.result):
+            return Response({"error": "Export has expired."}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.query_params.get("download"):
+            return FileResponse(
+                default_storage.open(task.result),
+                as_attachment=True,
+                filename=export_filename(request.user, when=task.created_at),
+                content_type="application/gzip",
+            )
+        download = replace_query_param(request.build_absolute_uri(), "download", "1")
         return Response(
-            {"message": "Profile deleted successfully."},
-            status=status.HTTP_204_NO_CONTENT
+            {"job": task.id, "status": "done", "url": download},
+            status=status.HTTP_200_OK
         )
 
 
@@ -239,42 +465,82 @@ class PostDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self, pk):
-        """Retrieve a specific post by PK."""
+        """Retrieve a specific post by PK (hidden once its owner is disabled)."""
         try:
-            return Post.objects.get(pk=pk)
+            return Post.objects.get(pk=pk, owner__is_active=True)
         except Post.DoesNotExist:
             return None
 
     def get(self, request, pk):
-        """Retrieve a specific post."""
-        post = self.get_object(pk)
-        if not post:
+        """Retrieve a specific post. The ETag identifies its version."""
+        data = self.post_data(pk, request)
+        if data is None:
             return Response({"error": "Post not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            viewer_post_fields(data, request),
+            status=status.HTTP_200_OK,
+            headers={"ETag": etag_for(data["version"])},
+        )
 
-        serializer = PostSerializer(post, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def post_data(self, pk, request):
+        """The shared representation of a post, through the detail cache."""
+        cache = get_detail_cache("post")
+        if cache is None:
+            return self.serialize_post(pk, request)
+        return cache.get(pk, lambda: self.serialize_post(pk, request))
+
+    def serialize_post(self, pk, request):
+        """Shared (viewer-independent) representation of a post, or None."""
+        try:
+            post = Post.objects.select_related('owner__profile').get(pk=pk, owner__is_active=True)
+        except Post.DoesNotExist:
+            return None
+        return dict(PostSerializer(post, context={'request': request}).data)
 
     def put(self, request, pk):
         """
         Update a specific post (only if the user is the owner).
+        Send the post's ETag as If-Match to edit only that version: if the
+        post has changed since, nothing is written and the response is 412
+        with the current ETag. Without If-Match (or with `*`) the edit
+        always applies, on top of whatever version is current.
         """
-        post = self.get_object(pk)
-        if not post:
+        post = Post.objects.filter(pk=pk, owner__is_active=True).values("owner_id", "version").first()
+        if post is None:
             return Response({"error": "Post not found."}, status=status.HTTP_404_NOT_FOUND)
-        if post.owner != request.user:
+        if post["owner_id"] != request.user.id:
             raise PermissionDenied("You do not have permission to edit this post.")
 
-        serializer = PostSerializer(
-            post, 
-            data=request.data, 
-            partial=True, 
-            context={'request': request}
-        )
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = PostSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        content = serializer.validated_data["content"]
+
+        versions = parse_if_match(request.headers.get("If-Match"))
+        unconditional = versions is None or versions == ANY
+        while True:
+            if unconditional:
+                versions = [post["version"]]
+            if edit_post(pk, request.user, content, versions):
+                break
+            post = Post.objects.filter(pk=pk, owner__is_active=True).values("version").first()
+            if post is None:
+                return Response({"error": "Post not found."}, status=status.HTTP_404_NOT_FOUND)
+            if not unconditional:
+                return Response(
+                    {"error": "Post has changed since it was read.", "version": post["version"]},
+                    status=status.HTTP_412_PRECONDITION_FAILED,
+                    headers={"ETag": etag_for(post["version"])},
+                )
+            # Another edit landed since the read; apply this one on top of it.
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        invalidate_detail("post", pk)
+        data = self.post_data(pk, request)
+        return Response(
+            viewer_post_fields(data, request),
+            status=status.HTTP_200_OK,
+            headers={"ETag": etag_for(data["version"])},
+        )
 
     def patch(self, request, pk):
         """
@@ -286,14 +552,25 @@ class PostDetailAPIView(APIView):
         if not post:
             return Response({"error": "Post not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Check if the user already liked the post
-        existing_like = Like.objects.filter(post=post, owner=request.user).first()
-        if existing_like:
-            existing_like.delete()  # Unlike
-            return Response({"message": "Like removed."}, status=status.HTTP_200_OK)
+        buffer = get_like_buffer()
+        if buffer is not None:
+            # Write-behind mode: record the toggle, flush to the DB later.
+            liked = buffer.toggle(post.id, request.user.id)
         else:
-            Like.objects.create(post=post, owner=request.user)  # Like
+            # Check if the user already liked the post
+            existing_like = Like.objects.filter(post=post, owner=request.user).first()
+            if existing_like:
+                existing_like.delete()  # Unlike
+                liked = False
+            else:
+                Like.objects.create(post=post, owner=request.user)  # Like
+                liked = True
+
+        # likes_count is part of the cached post.
+        invalidate_detail("post", post.id)
+        if liked:
             return Response({"message": "Post liked."}, status=status.HTTP_201_CREATED)
+        return Response({"message": "Like removed."}, status=status.HTTP_200_OK)
     
     def delete(self,request,pk):
         
@@ -311,12 +588,28 @@ class PostDetailAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        post.delete()
+        post.delete()  # clears post.pk
+        invalidate_detail("post", pk)
         return Response(
             {"message": "Post removed."},
             status=status.HTTP_200_OK
         )
 
+class PostHistoryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        """Earlier versions of a post, newest first, paginated."""
+        if not Post.objects.filter(pk=pk, owner__is_active=True).exists():
+            return Response({"error": "Post not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        revisions = PostRevision.objects.filter(post_id=pk).order_by('-version')
+        paginator = CustomPageNumberPagination()
+        page = paginator.paginate_queryset(revisions, request)
+        serializer = PostRevisionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
 class FollowAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -326,7 +619,7 @@ class FollowAPIView(APIView):
         'id' is the ID of the Profile to follow/unfollow.
         """
         try:
-            profile_to_follow = Profile.objects.get(id=id)
+            profile_to_follow = Profile.objects.get(id=id, user__is_active=True)
         except Profile.DoesNotExist:
             return Response({"error": "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -347,8 +640,126 @@ class FollowAPIView(APIView):
             requester_profile.follow(profile_to_follow)
             action = "followed"
 
+        # Both profiles' follower/following counts changed.
+        invalidate_detail("profile", profile_to_follow.id)
+        invalidate_detail("profile", requester_profile.id)
+
         return Response({
             "message": f"Successfully {action} {profile_to_follow.profilename}.",
             "is_following": requester_profile.is_following(profile_to_follow),
-            "followers_count": profile_to_follow.followers.count()
+            "followers_count": profile_to_follow.followers.filter(user__is_active=True).count()
         }, status=status.HTTP_200_OK)
+
+
+class FollowListAPIView(APIView):
+    """
+    Base for the follow-list endpoints. Subclasses pick the Follow edges
+    to list (`get_edges`) and the serializer for the profile on the other
+    end. Lists are keyset-paginated and each row says whether the viewer
+    follows that profile, computed with one EXISTS per row in the same
+    query.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+    listed_profile = None  # 'follower' or 'followed'
+
+    def get_edges(self, profile, viewer):
+        raise NotImplementedError
+
+    def get(self, request, id):
+        try:
+            profile = Profile.objects.get(id=id, user__is_active=True)
+        except Profile.DoesNotExist:
+            return Response({"error": "Profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        viewer = getattr(request.user, 'profile', None)
+        edges = self.get_edges(profile, viewer).filter(
+            **{f'{self.listed_profile}__user__is_active': True}
+        ).select_related(f'{self.listed_profile}__user')
+        if viewer is not None:
+            edges = edges.annotate(is_following=Exists(
+                Follow.objects.filter(followed=OuterRef(self.listed_profile), follower=viewer)
+            ))
+        else:
+            edges = edges.annotate(is_following=Value(False))
+
+        paginator = FollowKeysetPagination()
+        page = paginator.paginate_queryset(edges, request)
+        serializer = self.serializer_class(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+
+class FollowersAPIView(FollowListAPIView):
+    """Profiles following `id`."""
+    serializer_class = FollowerSerializer
+    listed_profile = 'follower'
+
+    def get_edges(self, profile, viewer):
+        return Follow.objects.filter(followed=profile)
+
+
+class FollowingAPIView(FollowListAPIView):
+    """Profiles `id` follows."""
+    serializer_class = FollowingSerializer
+    listed_profile = 'followed'
+
+    def get_edges(self, profile, viewer):
+        return Follow.objects.filter(follower=profile)
+
+
+class MutualFollowersAPIView(FollowListAPIView):
+    """
+    "Followers you know": profiles following `id` that the viewer also
+    follows. The intersection is a semi-join in SQL, so neither follow
+    list is ever loaded into Python.
+    """
+    serializer_class = FollowerSerializer
+    listed_profile = 'follower'
+
+    def get_edges(self, profile, viewer):
+        if viewer is None:
+            return Follow.objects.none()
+        return Follow.objects.filter(followed=profile).filter(Exists(
+            Follow.objects.filter(followed=OuterRef('follower'), follower=viewer)
+        ))
+
+
+class HealthAPIView(APIView):
+    """Liveness: the process is up and serving. Never touches the DB."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({"status": "ok"}, status=status.HTTP_200_OK)
+
+
+class ReadinessAPIView(APIView):
+    """Readiness: the process can reach its database (one `SELECT 1`)."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            # Details stay in the log; this endpoint is unauthenticated.
+            logger.exception("Readiness check could not reach the database")
+            return Response(
+                {"status": "unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({"status": "ok"}, status=status.HTTP_200_OK)
+
+
+def metrics_view(request):
+    """Per-route request metrics in the Prometheus text format."""
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("X-Metrics-Token") != token:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
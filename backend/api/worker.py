@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PeriodicSchedule, Task
+from .tasks import registry, worker_name
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Polls the Task table and runs due tasks, highest priority first.
+    Several workers (threads or processes) can run against the same
+    database: a task belongs to whoever flips it from pending to running.
+    """
+
+    def __init__(self, name=None, poll_interval=1.0, schedules=True):
+        self.name = name or worker_name()
+        self.poll_interval = poll_interval
+        self.schedules = schedules
+        self.stopping = False
+        self.lock_timeout = timedelta(seconds=getattr(settings, "TASK_LOCK_TIMEOUT", 600))
+        self.retry_delay = getattr(settings, "TASK_RETRY_DELAY", 10)
+
+    def run(self, once=False):
+        """Work until stopped; with `once`, exit when nothing is due."""
+        logger.info("Worker %s started", self.name)
+        while not self.stopping:
+            close_old_connections()
+            if self.schedules:
+                self.enqueue_due_schedules()
+            self.requeue_stale()
+            ran = self.run_next()
+            if not ran:
+                if once:
+                    break
+                time.sleep(self.poll_interval)
+        logger.info("Worker %s stopped", self.name)
+
+    def claim(self):
+        """Claim the next due task, or return None."""
+        now = timezone.now()
+        candidates = (
+            Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+            .order_by("-priority", "run_at", "id")
+            .values_list("id", flat=True)[:10]
+        )
+        for task_id in candidates:
+            claimed = Task.objects.filter(id=task_id, status=Task.PENDING).update(
+                status=Task.RUNNING,
+                locked_by=self.name,
+                locked_at=now,
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                return Task.objects.get(id=task_id)
+        return None
+
+    def run_next(self):
+        task = self.claim()
+        if task is None:
+            return False
+
+        func = registry.get(task.name)
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self.heartbeat, args=(task.id, stop_heartbeat), daemon=True
+        )
+        heartbeat.start()
+        try:
+            if func is None:
+                raise LookupError(f"No task registered as '{task.name}'.")
+            result = func(*task.args, **task.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception("Task %s failed (attempt %d)", task, task.attempts)
+            if task.attempts < task.max_attempts and func is not None:
+                # Exponential backoff: 10s, 20s, 40s, ...
+                delay = self.retry_delay * 2 ** (task.attempts - 1)
+                Task.objects.filter(id=task.id).update(
+                    status=Task.PENDING,
+                    run_at=timezone.now() + timedelta(seconds=delay),
+                    locked_by="",
+                    locked_at=None,
+                    last_error=error,
+                )
+            else:
+                Task.objects.filter(id=task.id).update(
+                    status=Task.FAILED, finished_at=timezone.now(), last_error=error
+                )
+            return True
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        Task.objects.filter(id=task.id).update(
+            status=Task.DONE, finished_at=timezone.now(), result=result
+        )
+        return True
+
+    def heartbeat(self, task_id, stop):
+        """
+        Refresh `locked_at` while a task runs, so a long task isn't taken
+        for a dead worker's and handed to another one.
+        """
+        interval = self.lock_timeout.total_seconds() / 3
+        try:
+            while not stop.wait(interval):
+                try:
+                    Task.objects.filter(
+                        id=task_id, status=Task.RUNNING, locked_by=self.name
+                    ).update(locked_at=timezone.now())
+                except DatabaseError:
+                    logger.warning("Heartbeat for task %s failed", task_id, exc_info=True)
+        finally:
+            connection.close()
+
+    def requeue_stale(self):
+        """
+        Hand back tasks whose worker died mid-run (no heartbeat for
+        TASK_LOCK_TIMEOUT), or fail them once they have used up their
+        attempts, so a task that keeps killing its worker stops.
+        """
+        now = timezone.now()
+        stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - self.lock_timeout)
+        stale.filter(attempts__gte=F("max_attempts")).update(
+            status=Task.FAILED,
+            finished_at=now,
+            locked_by="",
+            locked_at=None,
+            last_error="Worker stopped responding on the last attempt.",
+        )
+        stale.filter(attempts__lt=F("max_attempts")).update(
+            status=Task.PENDING, locked_by="", locked_at=None
+        )
+
+    def enqueue_due_schedules(self):
+        """Enqueue each TASK_SCHEDULES entry whose interval has elapsed."""
+        now = timezone.now()
+        for name, entry in getattr(settings, "TASK_SCHEDULES", {}).items():
+            schedule, _ = PeriodicSchedule.objects.get_or_create(name=name)
+            if schedule.next_run_at > now:
+                continue
+            advanced = PeriodicSchedule.objects.filter(
+                id=schedule.id, next_run_at=schedule.next_run_at
+            ).update(next_run_at=now + timedelta(seconds=entry["interval"]))
+            if advanced:
+                registry[entry["task"]].enqueue(*entry.get("args", []))
@@ -40,6 +40,77 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,  # Number of items per page
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.metrics.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.UserRateThrottle",
+    ],
+}
+
+# Token-bucket throttling (see api/throttling.py). `capacity` is the burst
+# size, `refill_rate` is tokens per second. Every request takes one token,
+# which covers its first THROTTLE_DB_MS_PER_TOKEN milliseconds of DB time;
+# each further THROTTLE_DB_MS_PER_TOKEN ms costs another token.
+#
+# Buckets are kept in the THROTTLE_CACHE cache. With several gunicorn
+# workers it must be shared between them (e.g. Redis): with the default
+# per-process LocMemCache each worker grants the full capacity, so the
+# real limit is capacity x workers. gunicorn.conf.py warns at startup.
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "true").lower() == "true"
+THROTTLE_CACHE = "default"
+THROTTLE_DB_MS_PER_TOKEN = 50
+THROTTLE_BUCKETS = {
+    "user": {"capacity": 120, "refill_rate": 2.0},
+    "feed": {"capacity": 30, "refill_rate": 0.5},
+    "profile_search": {"capacity": 20, "refill_rate": 1.0},
+}
+
+# Per-route request metrics (api/metrics.py), served at /metrics/.
+# When METRICS_TOKEN is set, scrapers must send it as `X-Metrics-Token`.
+# Queries slower than SLOW_QUERY_MS are logged with the project line that
+# issued them, for a SLOW_QUERY_SAMPLE_RATE fraction of occurrences.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Each gunicorn worker counts its own requests, and a scrape reaches only
+# one of them. With several workers, set METRICS_DIR to a directory they
+# share (on tmpfs): each worker writes its counters there every
+# METRICS_FLUSH_INTERVAL seconds and /metrics/ reports the sum.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = 1.0
+SLOW_QUERY_MS = 100
+SLOW_QUERY_SAMPLE_RATE = 0.1
+
+# N+1 query guard (api/nplusone.py). "off" in production; set to "log" or
+# "raise" on staging to flag any SQL shape repeated more than
+# NPLUSONE_THRESHOLD times in one request.
+NPLUSONE_MODE = os.getenv("NPLUSONE_MODE", "off")
+NPLUSONE_THRESHOLD = 5
+
+# JSON responses of at least COMPRESSION_MIN_SIZE bytes are compressed
+# with Brotli (if the optional `brotli` package is installed) or gzip.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = ("application/json",)
+
+# Background task queue (api/tasks.py, run by `manage.py runworker`).
+# TASK_SCHEDULES entries are enqueued every `interval` seconds. A running
+# task's lock is refreshed every TASK_LOCK_TIMEOUT / 3 seconds; one not
+# refreshed for TASK_LOCK_TIMEOUT is assumed orphaned and requeued.
+TASK_LOCK_TIMEOUT = 600
+TASK_RETRY_DELAY = 10
+TASK_RETENTION_DAYS = 7
+EXPORT_RETENTION_DAYS = 7
+TASK_SCHEDULES = {
+    "cleanup-media": {"task": "cleanup_media", "interval": 24 * 60 * 60},
+    "analyze-database": {"task": "analyze_database", "interval": 6 * 60 * 60},
+    "prune-tasks": {"task": "prune_tasks", "interval": 24 * 60 * 60},
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
 }
 
 
@@ -48,6 +119,41 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# Write-behind likes: buffer like/unlike toggles in-process and write them
+# to the DB in bulk every LIKE_BUFFER_FLUSH_INTERVAL seconds or once
+# LIKE_BUFFER_MAX_PENDING toggles are pending.
+#
+# The buffer lives in one process and a toggle reads its starting state
+# from the DB, so a worker that hasn't seen another worker's buffered
+# like would like the post a second time instead of unliking it. Only
+# use it with a single process (WEB_CONCURRENCY=1, scale with
+# GUNICORN_THREADS); gunicorn.conf.py refuses to start more workers.
+LIKE_WRITE_BEHIND = os.getenv("LIKE_WRITE_BEHIND", "false").lower() == "true"
+LIKE_BUFFER_MAX_PENDING = 1000
+LIKE_BUFFER_FLUSH_INTERVAL = 2.0
+
+# Single-flight cache for post and profile detail responses: concurrent
+# misses for one id share a single computation, entries are fresh for
+# DETAIL_CACHE_TTL seconds and then served stale for up to
+# DETAIL_CACHE_STALE_TTL more while one request refreshes them. Viewer
+# fields are filled in per request.
+#
+# Writes only invalidate the process that handled them, so a per-process
+# cache would let other gunicorn workers serve old content (and old
+# ETags, turning a client's next If-Match into a spurious 412). The cache
+# is therefore on only with DETAIL_CACHE_SHARED, where entries and the
+# refresh lock live in the DETAIL_CACHE_ALIAS cache, which must then be
+# shared between processes (e.g. Redis). DETAIL_CACHE_ENABLED=true forces
+# the per-process cache on, for single-process deployments.
+DETAIL_CACHE_SHARED = os.getenv("DETAIL_CACHE_SHARED", "false").lower() == "true"
+DETAIL_CACHE_ENABLED = os.getenv(
+    "DETAIL_CACHE_ENABLED", str(DETAIL_CACHE_SHARED)
+).lower() == "true"
+DETAIL_CACHE_TTL = 5
+DETAIL_CACHE_STALE_TTL = 60
+DETAIL_CACHE_MAX_ENTRIES = 10000
+DETAIL_CACHE_ALIAS = "default"
+
 
 # Application definition
 
@@ -64,6 +170,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.nplusone.NPlusOneMiddleware",
+    "api.middleware.CompressionMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +181,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
+    "api.middleware.RequestCostMiddleware",
 
 ]
 
@@ -0,0 +1,47 @@
+"""
+API-only settings profile for processes that serve just the JWT API.
+
+Use it for API workers:
+
+    DJANGO_SETTINGS_MODULE=backend.settings_api gunicorn backend.wsgi
+
+It drops what the API never uses: the admin, sessions, messages,
+staticfiles and templates, and the session/CSRF/messages/clickjacking
+middleware. JWT authentication happens in DRF, so Django's session-based
+AuthenticationMiddleware goes too. Only the JSON renderer is enabled, so
+the browsable API (which needs templates) is not available here; use
+the default `backend.settings` for the admin and browsable API.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+UNUSED_APPS = {
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+}
+
+UNUSED_MIDDLEWARE = {
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+MIDDLEWARE = [m for m in MIDDLEWARE if m not in UNUSED_MIDDLEWARE]
+
+TEMPLATES = []
+
+ROOT_URLCONF = 'backend.urls_api'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.metrics.TimedJSONRenderer",
+    ],
+}
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
-from api.views import UserAPIView
+from api.views import HealthAPIView, ReadinessAPIView, UserAPIView, metrics_view
 from rest_framework_simplejwt.views import TokenObtainPairView,TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
@@ -26,5 +26,8 @@ urlpatterns = [
     path('api/token/',TokenObtainPairView.as_view(),name="get_token"),
     path('api/token/refresh/',TokenRefreshView.as_view(),name="refresh"),
     path('api-auth/',include("rest_framework.urls")),
-    path('api/',include("api.urls"))
+    path('api/',include("api.urls")),
+    path('metrics/',metrics_view,name="metrics"),
+    path('health/',HealthAPIView.as_view(),name="health"),
+    path('ready/',ReadinessAPIView.as_view(),name="ready"),
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
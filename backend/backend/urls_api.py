@@ -0,0 +1,19 @@
+"""
+URL configuration for API-only workers (see backend/settings_api.py).
+Same API routes as backend/urls.py, without the admin and the
+session-based DRF login views.
+"""
+from django.urls import path,include
+from api.views import HealthAPIView, ReadinessAPIView, UserAPIView, metrics_view
+from rest_framework_simplejwt.views import TokenObtainPairView,TokenRefreshView
+from django.conf import settings
+from django.conf.urls.static import static
+urlpatterns = [
+    path('api/user/register/',UserAPIView.as_view(),name="register"),
+    path('api/token/',TokenObtainPairView.as_view(),name="get_token"),
+    path('api/token/refresh/',TokenRefreshView.as_view(),name="refresh"),
+    path('api/',include("api.urls")),
+    path('metrics/',metrics_view,name="metrics"),
+    path('health/',HealthAPIView.as_view(),name="health"),
+    path('ready/',ReadinessAPIView.as_view(),name="ready"),
+]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,112 @@
+"""
+Production gunicorn configuration.
+
+    gunicorn -c gunicorn.conf.py backend.wsgi
+
+These settings can be overridden from the environment:
+- WEB_CONCURRENCY: worker processes (default: 2 x cores + 1).
+- GUNICORN_THREADS: threads per worker (default 1, i.e. sync workers).
+- GUNICORN_MAX_REQUESTS: recycle a worker after this many requests
+  (plus up to 10% jitter), to bound memory growth (default 1000).
+- GUNICORN_TIMEOUT: seconds before a stuck worker is killed (default 30).
+- GUNICORN_GRACEFUL_TIMEOUT: seconds a stopping worker gets to finish
+  its requests (default 30).
+- GUNICORN_KEEPALIVE: seconds to hold idle keep-alive connections (default 5).
+- GUNICORN_ACCESSLOG: access log target, e.g. "-" for stdout (default off).
+- PORT / GUNICORN_BIND: listen address.
+- METRICS_DIR: where workers pool their /metrics/ counters (default: a
+  directory per master on /dev/shm, removed when it exits).
+
+The app is preloaded in the master, so workers fork with Django already
+imported and share those pages copy-on-write.
+
+Graceful reload:
+- `kill -HUP <master>` replaces the workers gracefully. Because the app
+  is preloaded, new workers keep the code the master loaded.
+- To deploy new code with no downtime, run `kill -USR2 <master>`. That
+  starts a new master running the new code. Then `kill -WINCH <old master>`
+  drains the old workers, and `kill -QUIT <old master>` stops it.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Heartbeat files on tmpfs, so a slow disk can't stall workers.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# Workers pool their /metrics/ counters in a directory (see api.metrics).
+# Unless METRICS_DIR is set, each master uses one of its own and removes
+# it on exit; METRICS_DIR_AUTO tells a USR2-spawned master that the
+# inherited directory is its parent's, not a configured one.
+_metrics_dir = None
+if os.getenv("METRICS_DIR", "") in ("", os.getenv("METRICS_DIR_AUTO")):
+    _metrics_dir = os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+        f"api-metrics-{os.getpid()}",
+    )
+    os.environ["METRICS_DIR"] = os.environ["METRICS_DIR_AUTO"] = _metrics_dir
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG")
+
+
+def on_starting(server):
+    """Refuse or warn about settings that assume a single worker process."""
+    # Buffered likes live in one process: with several workers, a toggle
+    # handled by a worker that hasn't seen the buffered one reads a stale
+    # like state from the DB.
+    from django.conf import settings
+    if getattr(settings, "LIKE_WRITE_BEHIND", False) and server.cfg.workers > 1:
+        raise RuntimeError(
+            "LIKE_WRITE_BEHIND needs a single worker process; "
+            f"set WEB_CONCURRENCY=1 (it is {server.cfg.workers}) or turn it off."
+        )
+
+    # Throttle buckets in a per-process cache are per worker: each worker
+    # grants the full capacity, and which one a client hits decides a 429.
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+    throttle_cache = caches[getattr(settings, "THROTTLE_CACHE", "default")]
+    if (getattr(settings, "THROTTLE_ENABLED", False) and server.cfg.workers > 1
+            and isinstance(throttle_cache, LocMemCache)):
+        server.log.warning(
+            "THROTTLE_CACHE is a per-process cache, so each of the %d workers "
+            "keeps its own rate limits; point it at a shared cache (e.g. Redis).",
+            server.cfg.workers,
+        )
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading must not be shared across forks.
+    from django.db import connections
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Write out buffered likes before a recycled or stopped worker exits.
+    from api.serializers import get_like_buffer
+    buffer = get_like_buffer()
+    if buffer is not None:
+        buffer.flush()
+    # Keep its request counters for /metrics/ (see api.metrics).
+    from api.metrics import registry
+    registry.fold_into_archive()
+
+
+def on_exit(server):
+    if _metrics_dir:
+        shutil.rmtree(_metrics_dir, ignore_errors=True)